@@ -0,0 +1 @@
+"""Scripts de génération de documents Asciidoctor (voir generate.py pour le point d'entrée)."""
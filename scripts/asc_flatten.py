@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+asc_flatten.py – Produit un document Asciidoctor à plat, sans include::.
+
+Remplace l'appel à asciidoctor-reducer : le document racine est lu ligne
+à ligne et chaque directive include:: est remplacée par les lignes du
+fichier inclus, récursivement, comme le fait le préprocesseur
+d'asciidoctor. Sont pris en charge :
+    - les références d'attributs dans le chemin ({chapitres}/intro.asc) ;
+    - leveloffset, entouré des lignes :leveloffset: comme chez asciidoctor ;
+    - les sélections tags=, tag= et lines= ;
+    - les conditions ifdef/ifndef (blocs et forme sur une ligne) et ifeval,
+      évaluées puis retirées ;
+    - opts=optional, et la ligne « Unresolved directive » pour un fichier
+      introuvable ;
+    - les directives échappées (\\include::, \\ifdef::...), recopiées telles
+      quelles comme le fait asciidoctor-reducer ;
+    - les inclusions cycliques, signalées et non développées.
+
+Les fichiers sont lus en flux : la mémoire utilisée ne dépend que de la
+profondeur d'inclusion, pas de la taille du document.
+
+Usage :
+    python asc_flatten.py [-a NOM=VALEUR ...] SOURCE [SORTIE]
+"""
+
+from pathlib import Path
+import argparse
+import operator
+import re
+import sys
+
+try:
+    from . import asc_header
+except ImportError:
+    import asc_header
+
+# Profondeur d'inclusion maximale d'asciidoctor (max-include-depth)
+MAX_DEPTH = 64
+
+INCLUDE_RE = re.compile(r'^(\\)?include::([^\s\[](?:[^\[]*[^\s\[])?)\[(.+)?\]$')
+CONDITIONAL_RE = re.compile(r'^(\\)?(ifdef|ifndef|ifeval|endif)::(\S*?(?:([,+])\S*?)?)\[(.+)?\]$')
+INCLUDE_ATTRIBUTE_RE = re.compile(r'(\w[\w-]*)=("[^"]*"|\'[^\']*\'|[^,]*)')
+EVAL_EXPRESSION_RE = re.compile(r'^(.+?) *([=!><]=|[><]) *(.+)$')
+COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+               '>': operator.gt, '>=': operator.ge}
+TAG_RE = re.compile(r'\b(tag|end)::(\S+?)\[\](?=$|\s)')
+LINE_RANGE_RE = re.compile(r'^(-?\d+)(?:\.\.(-?\d*))?$')
+# Blocs dont les lignes ne sont pas des déclarations d'attributs
+VERBATIM_RE = re.compile(r'^(?:-{4,}|\.{4,}|\+{4,})$')
+COMMENT_BLOCK_RE = re.compile(r'^/{4,}$')
+
+
+def _include_attributes(attrlist):
+    return {name: value.strip('"\'') for name, value in INCLUDE_ATTRIBUTE_RE.findall(attrlist or '')}
+
+
+def _line_selection(spec):
+    """Intervalles (début, fin) de lines=1..5;8;10..-1 ; fin None : jusqu'à la fin du fichier."""
+    ranges = []
+    for item in re.split(r'[;,]', spec):
+        match = LINE_RANGE_RE.match(item.strip())
+        if not match:
+            continue
+        start = int(match.group(1))
+        end = match.group(2)
+        if end is None:
+            ranges.append((start, start))
+        else:
+            end = int(end) if end not in ('', '-1') else None
+            ranges.append((start, end))
+    return ranges
+
+
+def _tag_selection(spec):
+    """
+    Interprète tags=a;!b;*;** comme asciidoctor : renvoie (sélection par
+    étiquette, sélection hors étiquette, sélection des étiquettes non citées).
+    """
+    select = {}
+    for name in filter(None, re.split(r'[;,]', spec)):
+        negated = name.startswith('!')
+        select[name[1:] if negated else name] = not negated
+    wildcard = None
+    if '**' in select:
+        base = select.pop('**')
+        if '*' in select:
+            wildcard = select.pop('*')
+        elif not base and next(iter(select.values()), None) is False:
+            wildcard = True
+    elif '*' in select:
+        # l'ordre compte : « *;!a » et « !*;a » ne sélectionnent pas les mêmes lignes
+        first = next(iter(select))
+        wildcard = select.pop('*')
+        base = not wildcard if first == '*' else False
+    else:
+        base = True not in select.values()
+    return select, base, wildcard
+
+
+def _select_lines(lines, attributes):
+    """Filtre les lignes d'un fichier inclus selon lines=, tags= ou tag=."""
+    if 'lines' in attributes:
+        ranges = _line_selection(attributes['lines'])
+        for number, line in enumerate(lines, 1):
+            if any(start <= number and (end is None or number <= end) for start, end in ranges):
+                yield line
+        return
+    spec = attributes.get('tags', attributes.get('tag'))
+    if spec is None:
+        yield from lines
+        return
+    select, base, wildcard = _tag_selection(spec)
+    stack = []  # (étiquette, sélectionnée)
+    for line in lines:
+        match = TAG_RE.search(line) if '::' in line else None
+        if match:
+            kind, name = match.groups()
+            if kind == 'tag':
+                current = stack[-1][1] if stack else base
+                if name in select:
+                    selected = select[name]
+                elif wildcard is None or (stack and not current):
+                    # étiquette non citée : suit l'étiquette englobante
+                    selected = current if wildcard is None else False
+                else:
+                    selected = wildcard
+                stack.append((name, selected))
+            elif stack and stack[-1][0] == name:
+                stack.pop()
+            continue
+        if (stack[-1][1] if stack else base):
+            yield line
+
+
+def _expression_value(value, attributes):
+    """Valeur d'un membre d'une expression ifeval, comme resolve_expr_val d'asciidoctor."""
+    quoted = len(value) > 1 and value[0] == value[-1] and value[0] in '"\''
+    if quoted:
+        value = value[1:-1]
+    value = asc_header.sub_attributes(value, attributes, drop_missing=True)
+    if quoted:
+        return value
+    if not value:
+        return None
+    if value in ('true', 'false'):
+        return value == 'true'
+    if not value.strip():
+        return ' '
+    if '.' in value:
+        match = re.match(r'\s*([+-]?(?:\d+(?:\.\d+)?|\.\d+))', value)
+        return float(match.group(1)) if match else 0.0
+    match = re.match(r'\s*([+-]?\d+)', value)
+    return int(match.group(1)) if match else 0
+
+
+def _evaluate(expression, attributes):
+    """Résultat de l'expression d'un ifeval ; faux si elle est invalide, comme chez asciidoctor."""
+    match = EVAL_EXPRESSION_RE.match((expression or '').strip())
+    if not match:
+        return False
+    lhs = _expression_value(match.group(1), attributes)
+    rhs = _expression_value(match.group(3), attributes)
+    numbers = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in (lhs, rhs))
+    if not numbers and type(lhs) is not type(rhs):
+        # types différents : égalité fausse, comparaison impossible
+        return match.group(2) == '!='
+    if match.group(2) not in ('==', '!=') and isinstance(lhs, (bool, type(None))):
+        return False
+    return COMPARISONS[match.group(2)](lhs, rhs)
+
+
+class Flattener:
+    """
+    Développe les include:: d'un document. Les attributs passés à la
+    construction (ligne de commande) ne sont pas modifiables par le document.
+    """
+
+    def __init__(self, attributes=None):
+        self.attributes = dict(attributes or {})
+        self.locked = set(self.attributes)
+        self.warnings = []
+
+    def _warn(self, message):
+        self.warnings.append(message)
+        print(f"asc_flatten: {message}", file=sys.stderr)
+
+    def _defined(self, name):
+        return name in self.attributes
+
+    def _condition(self, kind, target, operator):
+        names = re.split(r'[,+]', target) if operator else [target]
+        if operator == '+':
+            result = all(self._defined(n) for n in names)
+        else:
+            result = any(self._defined(n) for n in names)
+        return result if kind == 'ifdef' else not result
+
+    def flatten(self, path):
+        """Lignes (sans fin de ligne) du document `path` à plat."""
+        path = Path(path).resolve()
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from self._process(path, (line.rstrip() for line in f), [path])
+
+    def _process(self, path, lines, stack):
+        conditions = []   # pile des conditions : True (conservé), False (ignoré)
+        comment = None    # délimiteur du bloc de commentaire en cours
+        verbatim = None   # délimiteur du bloc littéral en cours
+        for line in lines:
+            skipping = False in conditions
+
+            if comment is not None:
+                if not skipping:
+                    yield line
+                if line == comment:
+                    comment = None
+                continue
+
+            if line.startswith(('if', 'endif', '\\if', '\\endif')):
+                match = CONDITIONAL_RE.match(line)
+                if match:
+                    escaped, kind, target, operator, text = match.groups()
+                    if escaped:
+                        # conservée avec sa barre oblique : le document à plat se relit à l'identique
+                        if not skipping:
+                            yield line
+                        continue
+                    if kind == 'endif':
+                        if conditions:
+                            conditions.pop()
+                        continue
+                    if kind == 'ifeval':
+                        if target:
+                            # cible interdite : directive invalide, laissée telle quelle
+                            if not skipping:
+                                yield line
+                            continue
+                        conditions.append(not skipping and _evaluate(text, self.attributes))
+                        continue
+                    if text is not None:
+                        # forme sur une ligne : ifdef::attr[contenu]
+                        if not skipping and self._condition(kind, target, operator):
+                            yield text
+                        continue
+                    conditions.append(False if skipping else self._condition(kind, target, operator))
+                    continue
+
+            if skipping:
+                continue
+
+            if COMMENT_BLOCK_RE.match(line):
+                comment = line
+                yield line
+                continue
+            if verbatim is None and VERBATIM_RE.match(line):
+                verbatim = line
+            elif line == verbatim:
+                verbatim = None
+            elif verbatim is None and line.startswith(':'):
+                asc_header.attribute_entry(line, self.attributes, self.locked)
+
+            if line.startswith(('include::', '\\include::')):
+                match = INCLUDE_RE.match(line)
+                if match:
+                    if match.group(1):
+                        yield line
+                    else:
+                        yield from self._include(path, line, match.group(2), match.group(3), stack)
+                    continue
+            yield line
+
+    def _include(self, path, line, target, attrlist, stack):
+        attributes = _include_attributes(attrlist)
+        resolved_target = asc_header.sub_attributes(target, self.attributes)
+        if '://' in resolved_target:
+            # inclusion distante : laissée à asciidoctor
+            yield line
+            return
+        included = (path.parent / resolved_target).resolve()
+        if included in stack:
+            self._warn(f"inclusion cyclique de {included} dans {path}, non développée")
+            yield line
+            return
+        if len(stack) > MAX_DEPTH:
+            self._warn(f"profondeur d'inclusion maximale ({MAX_DEPTH}) dépassée dans {path}")
+            yield line
+            return
+        if not included.is_file():
+            if 'optional' in attributes.get('opts', attributes.get('options', '')).split(','):
+                return
+            self._warn(f"fichier inclus introuvable : {included}")
+            yield f"Unresolved directive in {path.name} - include::{target}[{attrlist or ''}]"
+            return
+
+        leveloffset = attributes.get('leveloffset')
+        if leveloffset is not None:
+            previous = self.attributes.get('leveloffset')
+            yield f":leveloffset: {leveloffset}"
+            yield ''
+        with open(included, 'r', encoding='utf-8') as f:
+            lines = _select_lines((l.rstrip() for l in f), attributes)
+            if leveloffset is not None:
+                asc_header.attribute_entry(f":leveloffset: {leveloffset}", self.attributes, self.locked)
+            yield from self._process(included, lines, stack + [included])
+        if leveloffset is not None:
+            yield ''
+            restore = f":leveloffset: {previous}" if previous is not None else ':leveloffset!:'
+            asc_header.attribute_entry(restore, self.attributes, self.locked)
+            yield restore
+
+
+def flatten_file(source, output, attributes=None):
+    """Écrit dans `output` le document `source` à plat. Renvoie `output`."""
+    flattener = Flattener(attributes)
+    with open(output, 'w', encoding='utf-8') as out:
+        for line in flattener.flatten(source):
+            out.write(line)
+            out.write('\n')
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Développe les include:: d'un document Asciidoctor en un seul fichier")
+    parser.add_argument("source", help="Document .asc racine")
+    parser.add_argument("output", nargs="?", default=None,
+                        help="Fichier de sortie (défaut : sortie standard)")
+    parser.add_argument("-a", "--attribute", action="append", default=[],
+                        metavar="NOM=VALEUR", help="Attribut de document")
+    args = parser.parse_args()
+
+    attributes = asc_header.env_attributes()
+    for item in args.attribute:
+        name, _, value = item.partition('=')
+        attributes[name] = value
+
+    if args.output:
+        flatten_file(args.source, args.output, attributes)
+    else:
+        for line in Flattener(attributes).flatten(args.source):
+            sys.stdout.write(line + '\n')
+
+
+if __name__ == "__main__":
+    main()
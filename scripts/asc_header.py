@@ -0,0 +1,543 @@
+#!/usr/bin/env python3
+"""
+asc_header.py – Lit l'en-tête d'un document Asciidoctor sans passer par DocBook.
+
+Le module reproduit, pour les seules informations utilisées par parse.py
+(titre, auteur, ligne de révision, premier paragraphe contenant
+:authortitle:, :reviewer:, :approver: et :access:), ce qu'asciidoctor
+écrit dans sa sortie DocBook. Seules les premières lignes du fichier sont
+lues : la lecture s'arrête au premier paragraphe du document.
+
+Limites connues par rapport au passage par DocBook :
+    - le balisage en ligne (*gras*, _italique_, liens...) n'est pas interprété ;
+    - un document sans titre de niveau 0 donne un titre vide.
+
+Usage :
+    python asc_header.py [OPTIONS] FICHIER|RÉPERTOIRE [...]
+
+Options :
+    -a, --attribute NOM=VALEUR   Attribut de document (comme asciidoctor -a)
+    --json                       Écrit le contexte complet, un objet JSON par ligne
+"""
+
+from pathlib import Path
+import argparse
+import datetime
+import html
+import json
+import os
+import re
+import sys
+
+# Attributs passés à asciidoctor par generate.sh depuis l'environnement
+ENV_ATTRIBUTES = {
+    'companyname': 'COMPANY_NAME',
+    'legacyname': 'LEGACY_NAME',
+    'newname': 'NEW_NAME',
+}
+
+# Attributs intrinsèques d'asciidoctor utilisables dans l'en-tête
+INTRINSIC_ATTRIBUTES = {
+    'empty': '', 'sp': ' ', 'nbsp': '\u00a0', 'zwsp': '\u200b', 'wj': '\u2060',
+    'apos': "'", 'quot': '"', 'lsquo': '\u2018', 'rsquo': '\u2019',
+    'ldquo': '\u201c', 'rdquo': '\u201d', 'deg': '\u00b0', 'plus': '+',
+    'brvbar': '\u00a6', 'vbar': '|', 'amp': '&', 'lt': '<', 'gt': '>',
+    'startsb': '[', 'endsb': ']', 'caret': '^', 'asterisk': '*', 'tilde': '~',
+    'backslash': '\\', 'backtick': '`', 'two-colons': '::',
+    'two-semicolons': ';;', 'cpp': 'C++', 'pp': '++',
+}
+
+ATTRIBUTE_ENTRY_RE = re.compile(r'^:(!?\w[\w-]*!?):(?:[ \t]+(.*))?$')
+ATTRIBUTE_REF_RE = re.compile(r'(\\)?\{(\w[\w-]*)\}')
+AUTHOR_RE = re.compile(r"^(\w[\w\-'.]*)(?: +(\w[\w\-'.]*))?(?: +(\w[\w\-'.]*))?(?: +<([^>]+)>)?$")
+REVISION_RE = re.compile(r'^(?:[^\d{]*(.*?),)? *(?!:)(.*?)(?: *(?!^),?: *(.*))?$')
+SECTION_RE = re.compile(r'^(=+|#+) +\S')
+LIST_ITEM_RE = re.compile(r'^\s*(?:[*\-]+|\.+|\d+\.) +(\S.*)$')
+ADMONITION_RE = re.compile(r'^(?:NOTE|TIP|IMPORTANT|WARNING|CAUTION): +(.*)$')
+BLOCK_ATTRIBUTE_RE = re.compile(r'^\[(?:|[\w.#%{,"\'].*)\]$')
+BLOCK_TITLE_RE = re.compile(r'^\.(?![ \t.])\S')
+BLOCK_MACRO_RE = re.compile(r'^\w[\w-]*::\S*\[.*\]$')
+# Blocs délimités dont le contenu n'est pas du texte de paragraphe
+VERBATIM_RE = re.compile(r'^(?:-{4,}|\.{4,}|\+{4,}|/{4,}|`{3}.*|[|,:!]={3,})$')
+# Blocs délimités qui contiennent d'autres blocs
+COMPOUND_RE = re.compile(r'^(?:={4,}|\*{4,}|_{4,}|--)$')
+
+# Remplacements typographiques appliqués par asciidoctor (substitution « replacements ») :
+# (motif, remplacement, le premier groupe capturé est conservé en tête)
+REPLACEMENTS = [
+    (re.compile(r'\\?\(C\)'), '\u00a9', False),
+    (re.compile(r'\\?\(R\)'), '\u00ae', False),
+    (re.compile(r'\\?\(TM\)'), '\u2122', False),
+    (re.compile(r'(^|\n| |\\)--( |\n|$)'), '\u2009\u2014\u2009', False),
+    (re.compile(r'(\w)\\?--(?=\w)'), '\u2014\u200b', True),
+    (re.compile(r'\\?\.\.\.'), '\u2026\u200b', False),
+    (re.compile(r"\\?`'"), '\u2019', False),
+    (re.compile(r"([^\W_])\\?'(?=[^\W\d_])"), '\u2019', True),
+    (re.compile(r'\\?->'), '\u2192', False),
+    (re.compile(r'\\?=>'), '\u21d2', False),
+    (re.compile(r'\\?<-'), '\u2190', False),
+    (re.compile(r'\\?<='), '\u21d0', False),
+]
+ENTITY_RE = re.compile(r'\\?&((?:[a-zA-Z][a-zA-Z]+\d{0,2}|#\d\d\d{0,4}|#x[\da-fA-F][\da-fA-F][\da-fA-F]{0,3});)')
+
+
+# ---------------------------------------------------------------------------
+# Substitutions
+# ---------------------------------------------------------------------------
+def env_attributes():
+    """Attributs de document définis par generate.sh à partir de l'environnement."""
+    return {name: os.environ.get(var, '') for name, var in ENV_ATTRIBUTES.items()}
+
+
+def sub_attributes(text, attributes, drop_missing=False):
+    """
+    Remplace les références {nom} connues ; les autres restent telles
+    quelles, ou sont retirées avec `drop_missing` (attribute-missing: drop).
+    """
+    def remplace(match):
+        if match.group(1):
+            return match.group(0)[1:]
+        name = match.group(2).lower()
+        if name in attributes:
+            return attributes[name]
+        if name in INTRINSIC_ATTRIBUTES:
+            return INTRINSIC_ATTRIBUTES[name]
+        return '' if drop_missing else match.group(0)
+    return ATTRIBUTE_REF_RE.sub(remplace, text)
+
+
+def sub_replacements(text):
+    """Applique les remplacements typographiques d'asciidoctor."""
+    for pattern, replacement, leading in REPLACEMENTS:
+        def remplace(match, replacement=replacement, leading=leading):
+            if '\\' in match.group(0):
+                # forme échappée : on retire seulement la barre oblique inverse
+                return match.group(0).replace('\\', '', 1)
+            return (match.group(1) if leading else '') + replacement
+        text = pattern.sub(remplace, text)
+
+    def entite(match):
+        if match.group(0).startswith('\\'):
+            return match.group(0)[1:]
+        return html.unescape('&' + match.group(1))
+    return ENTITY_RE.sub(entite, text)
+
+
+def sub_normal(text, attributes):
+    """Substitutions appliquées au titre et aux paragraphes (hors balisage en ligne)."""
+    return sub_replacements(sub_attributes(text, attributes))
+
+
+# ---------------------------------------------------------------------------
+# Lecture de l'en-tête
+# ---------------------------------------------------------------------------
+def _lines(path):
+    """Itère sur les lignes du fichier, sans fin de ligne ni blancs finaux."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield line.rstrip()
+
+
+class _Reader:
+    """Lecteur de lignes avec lecture anticipée, qui ignore les commentaires."""
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._pending = []
+
+    def peek(self):
+        while not self._pending:
+            line = next(self._lines, None)
+            if line is None:
+                return None
+            if line == '////':
+                for line in self._lines:
+                    if line.rstrip() == '////':
+                        break
+                continue
+            if line.startswith('//') and not line.startswith('///'):
+                continue
+            self._pending.append(line)
+        return self._pending[0]
+
+    def read(self):
+        line = self.peek()
+        if line is not None:
+            self._pending.pop(0)
+        return line
+
+    def skip_blank(self):
+        while self.peek() == '':
+            self.read()
+
+
+def attribute_entry(line, attributes, locked):
+    """
+    Applique la déclaration :nom: valeur de `line` à `attributes`.
+    Les attributs de `locked` (passés en ligne de commande) ne sont pas modifiés.
+    Renvoie False si la ligne n'est pas une déclaration d'attribut.
+    """
+    match = ATTRIBUTE_ENTRY_RE.match(line)
+    if not match:
+        return False
+    name = match.group(1).lower()
+    if name.strip('!') in locked:
+        return True
+    if name.startswith('!') or name.endswith('!'):
+        attributes.pop(name.strip('!'), None)
+        return True
+    value = sub_attributes(match.group(2) or '', attributes)
+    if name == 'leveloffset' and value.startswith(('+', '-')):
+        # valeur relative : asciidoctor conserve le décalage absolu qui en résulte
+        value = str(_integer(attributes.get('leveloffset', '0')) + _integer(value))
+    attributes[name] = value
+    return True
+
+
+def _integer(value):
+    """Entier en tête de `value`, 0 s'il n'y en a pas (String#to_i de Ruby)."""
+    match = re.match(r'\s*([+-]?\d+)', value)
+    return int(match.group(1)) if match else 0
+
+
+def _attribute_entries(reader, attributes, locked):
+    """Consomme les déclarations d'attributs successives."""
+    while (line := reader.peek()) is not None and attribute_entry(line, attributes, locked):
+        reader.read()
+
+
+def _authors(author_line):
+    """Découpe la ligne d'auteurs comme process_authors d'asciidoctor."""
+    authors = []
+    for entry in (e.strip() for e in author_line.split(';')):
+        if not entry:
+            continue
+        match = AUTHOR_RE.match(entry)
+        if match:
+            first, middle, last, email = match.groups()
+            first = first.replace('_', ' ')
+            author = {'firstname': first, 'middlename': None, 'lastname': None,
+                      'email': email, 'initials': first[0]}
+            if middle and last:
+                author['middlename'] = middle.replace('_', ' ')
+                author['lastname'] = last.replace('_', ' ')
+                author['initials'] = first[0] + middle[0] + last[0]
+            elif middle:
+                author['lastname'] = middle.replace('_', ' ')
+                author['initials'] = first[0] + middle[0]
+        else:
+            first = ' '.join(entry.split())
+            author = {'firstname': first, 'middlename': None, 'lastname': None,
+                      'email': None, 'initials': first[0]}
+        authors.append(author)
+    return authors
+
+
+def _attribute_authors(attributes):
+    """Auteur déclaré par :author: (et éventuellement :email:)."""
+    names = attributes['author'].split(None, 2)
+    if not names:
+        return []
+    author = {'firstname': names[0].replace('_', ' '), 'middlename': None,
+              'lastname': None, 'email': attributes.get('email') or None,
+              'initials': names[0][0]}
+    if len(names) == 3:
+        author['middlename'] = names[1].replace('_', ' ')
+        author['lastname'] = ' '.join(names[2].split()).replace('_', ' ')
+        author['initials'] += names[1][0] + names[2][0]
+    elif len(names) == 2:
+        author['lastname'] = names[1].replace('_', ' ')
+        author['initials'] += names[1][0]
+    return [author]
+
+
+def _revision(line):
+    """Analyse la ligne de révision : (numéro, date, remarque)."""
+    match = REVISION_RE.match(line)
+    revnumber = match.group(1).rstrip() if match.group(1) else None
+    revdate = None
+    component = match.group(2).strip()
+    if component:
+        if not match.group(1) and component.startswith('v'):
+            revnumber = component[1:]
+        else:
+            revdate = component
+    revremark = match.group(3).rstrip() if match.group(3) else None
+    return revnumber, revdate, revremark
+
+
+def _first_paragraph(reader, attributes, locked):
+    """
+    Renvoie le texte du premier paragraphe du document (le premier
+    <simpara> de la sortie DocBook), ou None s'il n'y en a pas.
+    """
+    while (line := reader.read()) is not None:
+        stripped = line.strip()
+        if not stripped or SECTION_RE.match(line) or attribute_entry(line, attributes, locked):
+            continue
+        if BLOCK_ATTRIBUTE_RE.match(stripped) or BLOCK_TITLE_RE.match(stripped) or \
+                BLOCK_MACRO_RE.match(stripped) or COMPOUND_RE.match(stripped):
+            continue
+        if VERBATIM_RE.match(stripped):
+            delimiter = stripped[:3] if stripped.startswith('```') else stripped
+            while (inner := reader.read()) is not None and inner.strip() != delimiter:
+                pass
+            continue
+        in_list = LIST_ITEM_RE.match(line)
+        if line[0] in ' \t' and not in_list:
+            # paragraphe littéral : pas de <simpara>
+            while reader.peek():
+                reader.read()
+            continue
+        match = in_list or ADMONITION_RE.match(line)
+        paragraph = [match.group(1) if match else line]
+        while (line := reader.peek()):
+            stripped = line.strip()
+            if BLOCK_ATTRIBUTE_RE.match(stripped) or VERBATIM_RE.match(stripped) or \
+                    COMPOUND_RE.match(stripped):
+                break
+            if in_list and (stripped == '+' or LIST_ITEM_RE.match(line)):
+                break
+            paragraph.append(reader.read().strip() if in_list else reader.read())
+        return sub_normal('\n'.join(paragraph), attributes)
+    return None
+
+
+def _docdate(path, attributes):
+    """Date du document, calculée comme la docdate d'asciidoctor."""
+    if 'reproducible' in attributes:
+        return None
+    if 'docdate' in attributes:
+        return attributes['docdate']
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return datetime.datetime.fromtimestamp(int(epoch), datetime.timezone.utc).strftime('%Y-%m-%d')
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d')
+
+
+def read_info(path, attributes=None):
+    """
+    Lit l'en-tête de `path` et renvoie les informations telles que parse.py
+    les extrait du DocBook :
+        { title, subtitle, date, firstname, surname, email, authorinitials,
+          revisions: [ {revnumber, date, authorinitials, revremark} ],
+          simpara }
+    `attributes` correspond aux options -a passées à asciidoctor.
+    """
+    doc_attributes = {k.lower(): v for k, v in (attributes or {}).items()}
+    locked = set(doc_attributes)
+    reader = _Reader(_lines(path))
+
+    # attributs déclarés avant le titre
+    reader.skip_blank()
+    while reader.peek() and ATTRIBUTE_ENTRY_RE.match(reader.peek()):
+        _attribute_entries(reader, doc_attributes, locked)
+        reader.skip_blank()
+
+    title = None
+    authors = []
+    line = reader.peek()
+    if line is not None and line.startswith('= ') and line[2:].strip():
+        reader.read()
+        title = line[2:].strip()
+        _attribute_entries(reader, doc_attributes, locked)
+        if reader.peek():
+            authors = _authors(sub_attributes(reader.read(), doc_attributes))
+            _attribute_entries(reader, doc_attributes, locked)
+            if reader.peek():
+                revnumber, revdate, revremark = _revision(sub_attributes(reader.read(), doc_attributes))
+                for name, value in (('revnumber', revnumber), ('revdate', revdate), ('revremark', revremark)):
+                    if value is not None:
+                        doc_attributes.setdefault(name, value)
+            _attribute_entries(reader, doc_attributes, locked)
+    if not authors and doc_attributes.get('author'):
+        authors = _attribute_authors(doc_attributes)
+
+    subtitle = None
+    if title is not None:
+        title = sub_normal(title, doc_attributes)
+        separator = doc_attributes.get('title-separator', ':') + ' '
+        if separator in title:
+            title, _, subtitle = title.rpartition(separator)
+
+    author = authors[0] if authors else {}
+    revisions = []
+    if 'revdate' in doc_attributes and ('revnumber' in doc_attributes or 'revremark' in doc_attributes):
+        revisions.append({
+            'revnumber': doc_attributes.get('revnumber'),
+            'date': doc_attributes['revdate'],
+            'authorinitials': author.get('initials'),
+            'revremark': doc_attributes.get('revremark'),
+        })
+    # DocBook ne porte <authorinitials> dans <info> que pour un auteur unique ;
+    # sinon le premier trouvé est celui de la révision
+    authorinitials = author['initials'] if len(authors) == 1 or (authors and revisions) else None
+
+    return {
+        'title': title,
+        'subtitle': subtitle,
+        'date': doc_attributes.get('revdate') or _docdate(path, doc_attributes),
+        'firstname': sub_replacements(author['firstname']) if author else None,
+        'surname': sub_replacements(author['lastname']) if author.get('lastname') else None,
+        'email': author.get('email'),
+        'authorinitials': authorinitials,
+        'revisions': revisions,
+        'simpara': _first_paragraph(reader, doc_attributes, locked),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Construction du contexte de parse.py
+# ---------------------------------------------------------------------------
+def _escape(value):
+    return html.escape(value) if value is not None else ''
+
+
+def extract_field(simpara, field_name):
+    """Extrait la valeur d'une ligne :field_name: du premier paragraphe."""
+    for line in simpara.splitlines():
+        if line.startswith(f":{field_name}:"):
+            return line.split(f":{field_name}:")[1].strip()
+    return ''
+
+
+def build_context(info):
+    """
+    Construit le contexte jinja2 de parse.py à partir des informations
+    d'en-tête, qu'elles viennent du DocBook ou de read_info().
+    """
+    author_firstname = _escape(info.get('firstname'))
+    author_surname = _escape(info.get('surname'))
+    author_email = _escape(info.get('email'))
+    author_initials = _escape(info.get('authorinitials'))
+    title = _escape(info.get('title'))
+    subtitle = _escape(info.get('subtitle'))
+    date = info.get('date')
+    date = html.escape(date) if date is not None else datetime.date.today().isoformat()
+
+    # Extraire la table de versions depuis le premier paragraphe
+    revtable = []
+    authortitle = ''
+    access_level = ''
+    reviewer, reviewertitle = '', ''
+    approver, approvertitle = '', ''
+    simpara_content = info.get('simpara')
+    if simpara_content is not None:
+        authortitle = html.escape(extract_field(simpara_content, 'authortitle'))
+        access_level = html.escape(extract_field(simpara_content, 'access')) or 'public'
+        try:
+            reviewer_line = extract_field(simpara_content, 'reviewer')
+            if reviewer_line:
+                reviewer, reviewertitle = [html.escape(s.strip()) for s in reviewer_line.split('|')]
+
+            approver_line = extract_field(simpara_content, 'approver')
+            if approver_line:
+                approver, approvertitle = [html.escape(s.strip()) for s in approver_line.split('|')]
+
+            for line in simpara_content.splitlines():
+                if line.startswith(':') or not line.strip():
+                    continue
+                try:
+                    version, rest = line.split(',', 1)
+                    date, rest = rest.split(':', 1)
+                    author, comment = rest.split('|', 1)
+                    revtable.append({
+                        'version': html.escape(version.strip()),
+                        'author': html.escape(author.strip()),
+                        'date': html.escape(date.strip()),
+                        'comment': html.escape(comment.strip()),
+                    })
+                except ValueError:
+                    # Si une ligne est mal formée, on l'ignore
+                    continue
+        except ValueError:
+            pass
+
+    # Révisions de l'en-tête (<revhistory>)
+    revnumber = ''
+    for revision in info.get('revisions') or []:
+        revnumber = html.escape(revision['revnumber'] or '')
+        date = html.escape(revision['date'])
+        revremark = revision.get('revremark')
+        if revremark is None:
+            author = _escape(revision.get('authorinitials'))
+            comment = ''
+        else:
+            author, _, comment = revremark.strip().partition('|')
+            author, comment = html.escape(author), html.escape(comment)
+        # Ajouter la révision au début du tableau
+        revtable.insert(0, {
+            'version': revnumber.strip(),
+            'author': author,
+            'date': date.strip(),
+            'comment': comment,
+        })
+
+    return {
+        'title': title,
+        'subtitle': subtitle,
+        'revision': revnumber,
+        'date': date,
+        'access': access_level,
+        'author': f"{author_firstname} {author_surname}",
+        'email': author_email,
+        'authorfirstname': author_firstname,
+        'authorsurname': author_surname,
+        'authorinitials': author_initials,
+        'authortitle': authortitle,
+        'reviewername': reviewer,
+        'reviewertitle': reviewertitle,
+        'approvername': approver,
+        'approvertitle': approvertitle,
+        'revtable': revtable,
+    }
+
+
+def header_context(path, attributes=None):
+    """Contexte de parse.py calculé directement depuis le fichier .asc."""
+    return build_context(read_info(path, attributes))
+
+
+# ---------------------------------------------------------------------------
+# Programme principal : catalogue de métadonnées
+# ---------------------------------------------------------------------------
+def _documents(paths):
+    for p in paths:
+        p = Path(p)
+        if p.is_dir():
+            yield from sorted(p.rglob("*.asc"))
+        else:
+            yield p
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Extrait les métadonnées d'en-tête de documents Asciidoctor")
+    parser.add_argument("paths", nargs="+",
+                        help="Fichiers .asc ou répertoires à parcourir")
+    parser.add_argument("-a", "--attribute", action="append", default=[],
+                        metavar="NOM=VALEUR", help="Attribut de document")
+    parser.add_argument("--json", action="store_true",
+                        help="Écrit le contexte complet en JSON (un document par ligne)")
+    args = parser.parse_args()
+
+    attributes = env_attributes()
+    for item in args.attribute:
+        name, _, value = item.partition('=')
+        attributes[name] = value
+
+    for document in _documents(args.paths):
+        try:
+            context = header_context(document, attributes)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Erreur : {document} : {e}", file=sys.stderr)
+            continue
+        if args.json:
+            print(json.dumps({'file': str(document), **context}, ensure_ascii=False))
+        else:
+            print(f"{document}\t{html.unescape(context['title'])}\t"
+                  f"{html.unescape(context['revision'])}\t{html.unescape(context['access'])}")
+
+
+if __name__ == "__main__":
+    main()
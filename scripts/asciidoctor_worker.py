@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+asciidoctor_worker.py – Client d'un processus asciidoctor persistant.
+
+Chaque appel à `asciidoctor` paie le démarrage de Ruby et le chargement
+des gems. Ce module lance une seule fois asciidoctor_worker.rb (asciidoctor
+et asciidoctor-diagram préchargés) et lui envoie les conversions DocBook
+par un tube, une requête JSON par ligne. Le processus est recyclé après un nombre donné
+de conversions ou lorsque sa mémoire a trop augmenté.
+
+Usage :
+    python asciidoctor_worker.py [OPTIONS] SOURCE [SOURCE ...]
+
+Options :
+    --outdir RÉPERTOIRE     Répertoire de sortie (défaut : courant)
+    --name NOM              Nom des sorties, sans extension (une seule source)
+    --flat                  Produit aussi le fichier .adoc à plat (asc_flatten.py, sans Ruby)
+    --no-docbook            Ne produit pas le DocBook
+    -a, --attribute NOM=VALEUR
+    --max-jobs N            Conversions avant recyclage du processus (défaut : 50)
+"""
+
+from pathlib import Path
+import argparse
+import json
+import subprocess
+import sys
+
+try:
+    from . import asc_flatten, asc_header
+except ImportError:
+    import asc_flatten
+    import asc_header
+
+WORKER_SCRIPT = Path(__file__).resolve().parent / 'asciidoctor_worker.rb'
+
+# Attributs passés par generate.sh pour la production du DocBook
+DOCBOOK_ATTRIBUTES = {
+    'allow-uri-read': '',
+    'source-highlighter': 'rouge',
+}
+
+
+class WorkerError(RuntimeError):
+    """Échec d'une conversion ou arrêt inattendu du processus asciidoctor."""
+
+
+def _rss_kb(pid):
+    """Mémoire résidente du processus en ko (Linux), ou None si indisponible."""
+    try:
+        with open(f'/proc/{pid}/status', 'r', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class AsciidoctorWorker:
+    """
+    Processus asciidoctor persistant.
+
+    Le processus est démarré au premier travail et recyclé après `max_jobs`
+    conversions, ou quand sa mémoire résidente dépasse `max_rss_growth` fois
+    celle mesurée après le premier travail (ou `max_rss_mb` si précisé).
+    """
+
+    def __init__(self, max_jobs=50, max_rss_growth=2.0, max_rss_mb=None, ruby='ruby'):
+        self.max_jobs = max_jobs
+        self.max_rss_growth = max_rss_growth
+        self.max_rss_mb = max_rss_mb
+        self.ruby = ruby
+        self._process = None
+        self._jobs = 0
+        self._next_id = 0
+        self._base_rss = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -----------------------------------------------------------------------
+    # Cycle de vie
+    # -----------------------------------------------------------------------
+    def start(self):
+        self._process = subprocess.Popen(
+            [self.ruby, str(WORKER_SCRIPT)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            text=True, encoding='utf-8', bufsize=1)
+        self._jobs = 0
+        self._base_rss = None
+
+    def stop(self):
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            process.stdin.close()
+            process.wait(timeout=30)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+
+    def _recycle_if_needed(self):
+        """Redémarre le processus si son quota de travaux ou de mémoire est atteint."""
+        if self._process is None:
+            return
+        if self._jobs >= self.max_jobs:
+            self.stop()
+            return
+        rss = _rss_kb(self._process.pid)
+        if rss is None:
+            return
+        if self._base_rss is None:
+            self._base_rss = rss
+        elif rss > self._base_rss * self.max_rss_growth:
+            self.stop()
+        elif self.max_rss_mb is not None and rss > self.max_rss_mb * 1024:
+            self.stop()
+
+    # -----------------------------------------------------------------------
+    # Travaux
+    # -----------------------------------------------------------------------
+    def _run(self, job):
+        if self._process is None or self._process.poll() is not None:
+            self.start()
+        self._next_id += 1
+        job['id'] = self._next_id
+        try:
+            self._process.stdin.write(json.dumps(job) + '\n')
+            self._process.stdin.flush()
+            answer = self._process.stdout.readline()
+        except OSError:
+            answer = ''
+        if not answer:
+            self.stop()
+            raise WorkerError(f"le processus asciidoctor s'est arrêté pendant {job['input']}")
+        self._jobs += 1
+        result = json.loads(answer)
+        self._recycle_if_needed()
+        if not result.get('ok'):
+            raise WorkerError(f"{job['input']} : {result.get('error')}")
+        return job['output'] if job.get('output') else result.get('content')
+
+    def docbook(self, source, output=None, outdir=None, attributes=None):
+        """
+        Produit le DocBook de `source` (asciidoctor -b docbook -r asciidoctor-diagram).
+        Sans `output`, rien n'est écrit sur disque : le DocBook est renvoyé
+        sous forme de texte (les diagrammes sont générés dans `outdir`).
+        """
+        output = Path(output).resolve() if output else None
+        if outdir is None:
+            outdir = output.parent if output else Path(source).resolve().parent
+        return self._run({
+            'action': 'docbook',
+            'input': str(Path(source).resolve()),
+            'output': str(output) if output else None,
+            'outdir': str(Path(outdir).resolve()),
+            'attributes': {**DOCBOOK_ATTRIBUTES, **(attributes or {})},
+        })
+
+
+# ---------------------------------------------------------------------------
+# Programme principal : conversion d'un lot de documents
+# ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convertit des documents Asciidoctor avec un seul processus asciidoctor")
+    parser.add_argument("sources", nargs="+", help="Documents .asc")
+    parser.add_argument("--outdir", default=".", help="Répertoire de sortie")
+    parser.add_argument("--name", default=None,
+                        help="Nom des sorties, sans extension (une seule source)")
+    parser.add_argument("--flat", action="store_true",
+                        help="Produit aussi le document à plat .adoc")
+    parser.add_argument("--no-docbook", dest="docbook", action="store_false",
+                        help="Ne produit pas le DocBook")
+    parser.add_argument("-a", "--attribute", action="append", default=[],
+                        metavar="NOM=VALEUR", help="Attribut de document")
+    parser.add_argument("--max-jobs", dest="max_jobs", type=int, default=50,
+                        help="Conversions avant recyclage du processus")
+    args = parser.parse_args()
+
+    if args.name and len(args.sources) > 1:
+        sys.exit("Erreur : --name n'est utilisable qu'avec une seule source.")
+
+    attributes = asc_header.env_attributes()
+    for item in args.attribute:
+        name, _, value = item.partition('=')
+        attributes[name] = value
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    with AsciidoctorWorker(max_jobs=args.max_jobs) as worker:
+        for source in args.sources:
+            name = args.name or Path(source).name.split('.')[0]
+            try:
+                if args.docbook:
+                    worker.docbook(source, outdir / f"{name}.xml", outdir, attributes)
+                if args.flat:
+                    asc_flatten.flatten_file(source, outdir / f"{name}.adoc", attributes)
+            except WorkerError as e:
+                print(f"Erreur : {e}", file=sys.stderr)
+                failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
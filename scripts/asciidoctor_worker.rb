@@ -0,0 +1,44 @@
+#!/usr/bin/env ruby
+# Persistent asciidoctor process driven by asciidoctor_worker.py
+#
+# asciidoctor and asciidoctor-diagram are loaded once; jobs are then
+# read from stdin, one JSON object per line:
+#   {"id": 1, "action": "docbook", "input": "...", "output": "...",
+#    "outdir": "...", "attributes": {"companyname": "..."}}
+# and one JSON answer is written per job: {"id": 1, "ok": true} or {"id": 1, "ok": false, "error": "..."}
+# A docbook job without "output" is not written to disk: the DocBook is returned in the answer
+# ({"id": 1, "ok": true, "content": "..."}); diagrams are still generated in "outdir".
+# Everything printed by asciidoctor or its extensions goes to stderr so that stdout only carries answers.
+
+require 'json'
+require 'asciidoctor'
+require 'asciidoctor-diagram'
+
+answers = $stdout.dup
+answers.sync = true
+$stdout.reopen $stderr
+
+$stdin.each_line do |line|
+  job = nil
+  begin
+    job = JSON.parse line
+    attributes = job['attributes'] || {}
+    answer = { 'id' => job['id'], 'ok' => true }
+    case job['action']
+    when 'docbook'
+      if job['output']
+        Asciidoctor.convert_file job['input'], backend: 'docbook', safe: :unsafe, mkdirs: true,
+          to_dir: job['outdir'], to_file: job['output'], attributes: attributes
+      else
+        document = Asciidoctor.load_file job['input'], backend: 'docbook', safe: :unsafe, standalone: true,
+          to_dir: job['outdir'], attributes: attributes.merge('outdir' => job['outdir'])
+        answer['content'] = document.convert
+      end
+    else
+      raise %(unknown action #{job['action']})
+    end
+    answers.puts JSON.generate(answer)
+  rescue StandardError, ScriptError => e
+    answers.puts JSON.generate('id' => (job && job['id']), 'ok' => false, 'error' => %(#{e.class}: #{e.message}))
+  end
+end
@@ -18,6 +18,10 @@ for arg in "$@"; do
     --template=*)
       tfile="${arg#*=}"
       ;;
+    -h|--help)
+      echo "Usage : $0 [--style=<file>] [--template=<file>] <filename>"
+      exit 0
+      ;;
     *)
       if [[ -z "$file" ]]; then
         file="$arg"
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+dedup_styles.py – Fusionne les styles automatiques identiques d'un document fodt.
+
+LibreOffice et pandoc créent un style automatique (P1…P900, T1…T400...) par
+variation de mise en forme, et beaucoup ne diffèrent que par les attributs
+officeooo:rsid / officeooo:paragraph-rsid, qui ne servent qu'au suivi des
+sessions d'édition. Chaque style automatique est réduit à une empreinte
+(famille, attributs, propriétés triées, sans les rsid) ; les doublons sont
+supprimés et toutes leurs références renvoient vers le premier style de
+même empreinte.
+
+Les références réécrites sont celles que traite style.py : text:style-name,
+draw:style-name, draw:text-style-name, table:style-name,
+style:parent-style-name et style:next-style-name.
+
+Usage :
+    python dedup_styles.py <fichier_entree.fodt> <fichier_sortie.fodt>
+"""
+
+import hashlib
+import re
+import sys
+
+try:
+    from . import fodt_scan
+except ImportError:
+    import fodt_scan
+
+AUTOMATIC_STYLES_RE = re.compile(r'(<office:automatic-styles>)(.*?)(</office:automatic-styles>)', re.DOTALL)
+STYLE_RE = re.compile(r'[ \t]*<style:style\b([^>]*?)(?:/>|>(.*?)</style:style>)[ \t]*\n?', re.DOTALL)
+ATTRIBUTE_RE = re.compile(r'([\w:.-]+)="([^"]*)"')
+TAG_RE = re.compile(r'<([\w:.-]+)((?:\s+[\w:.-]+="[^"]*")*)\s*(/?)>')
+DEFINITION_RE = re.compile(r'\bstyle:name="([^"]+)"')
+REFERENCE_RE = re.compile(
+    r'\b(text:style-name|draw:style-name|draw:text-style-name|table:style-name|'
+    r'style:parent-style-name|style:next-style-name)="([^"]+)"')
+
+# Attributs sans effet sur le rendu, ignorés pour comparer deux styles
+IGNORED_ATTRIBUTES = {'officeooo:rsid', 'officeooo:paragraph-rsid'}
+
+
+def _protected(name):
+    """Styles jamais fusionnés : '__' (encodé _5f__5f_) et TemplateTable, comme dans style.py."""
+    return name.startswith(('__', '_5f__5f_', 'TemplateTable'))
+
+
+def _canonical_tag(match):
+    attributes = sorted((k, v) for k, v in ATTRIBUTE_RE.findall(match.group(2))
+                        if k not in IGNORED_ATTRIBUTES)
+    return '<' + match.group(1) + ''.join(f' {k}="{v}"' for k, v in attributes) + match.group(3) + '>'
+
+
+def _fingerprint(attributes, body, mapping):
+    """Empreinte d'un style, références déjà fusionnées remplacées."""
+    key = sorted((k, mapping.get(v, v) if k.endswith('-style-name') else v)
+                 for k, v in attributes if k not in ('style:name', 'style:display-name'))
+    body = re.sub(r'>\s+<', '><', (body or '').strip())
+    body = TAG_RE.sub(_canonical_tag, body)
+    body = REFERENCE_RE.sub(lambda m: f'{m.group(1)}="{mapping.get(m.group(2), m.group(2))}"', body)
+    return hashlib.sha1(repr((key, body)).encode('utf-8')).hexdigest()
+
+
+def deduplicate(content):
+    """
+    Fusionne les styles automatiques identiques de `content` (texte d'un fodt).
+    Renvoie le nouveau contenu et le dictionnaire {style supprimé: style conservé}.
+    """
+    # un nom défini plusieurs fois (familles différentes) est ambigu : on n'y touche pas
+    counts = {}
+    for name in DEFINITION_RE.findall(content):
+        counts[name] = counts.get(name, 0) + 1
+
+    styles = []
+    for region in AUTOMATIC_STYLES_RE.finditer(content):
+        for match in STYLE_RE.finditer(region.group(2)):
+            attributes = ATTRIBUTE_RE.findall(match.group(1))
+            name = dict(attributes).get('style:name')
+            if name and counts.get(name) == 1 and not _protected(name):
+                styles.append((name, attributes, match.group(2)))
+
+    # les fusions peuvent en rendre d'autres possibles (styles parents) : point fixe
+    mapping = {}
+    while True:
+        seen, merged = {}, {}
+        for name, attributes, body in styles:
+            if name in mapping:
+                continue
+            fingerprint = _fingerprint(attributes, body, mapping)
+            if fingerprint in seen:
+                merged[name] = seen[fingerprint]
+            else:
+                seen[fingerprint] = name
+        if not merged:
+            break
+        mapping.update(merged)
+    # chaînes éventuelles a -> b -> c
+    for name, target in mapping.items():
+        while target in mapping:
+            target = mapping[target]
+        mapping[name] = target
+
+    if not mapping:
+        return content, mapping
+
+    def drop_duplicates(region):
+        def keep(match):
+            name = dict(ATTRIBUTE_RE.findall(match.group(1))).get('style:name')
+            return '' if name in mapping else match.group(0)
+        return region.group(1) + STYLE_RE.sub(keep, region.group(2)) + region.group(3)
+
+    content = AUTOMATIC_STYLES_RE.sub(drop_duplicates, content)
+    content = REFERENCE_RE.sub(
+        lambda m: f'{m.group(1)}="{mapping[m.group(2)]}"' if m.group(2) in mapping else m.group(0),
+        content)
+    return content, mapping
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python3 dedup_styles.py <fichier_entree.fodt> <fichier_sortie.fodt>")
+        sys.exit(1)
+
+    input_file = sys.argv[1]
+    output_file = sys.argv[2]
+
+    # images embarquées mises de côté : seul le texte du document est parcouru
+    store = fodt_scan.BinaryStore()
+    content = fodt_scan.read(input_file, store)
+
+    result, mapping = deduplicate(content)
+
+    fodt_scan.write(output_file, result, store)
+    print(f"{len(mapping)} styles automatiques fusionnés, "
+          f"{len(content) - len(result)} caractères en moins : {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+docbook_shards.py – Découpe un DocBook volumineux en morceaux au niveau des chapitres.
+
+Chaque morceau est un document DocBook complet (même élément racine) qui
+contient une suite de divisions de premier niveau (chapter, part, appendix,
+section...) ; le premier morceau garde aussi <info> et le préambule. Les
+morceaux sont équilibrés en taille et peuvent être convertis en parallèle
+par pandoc et LibreOffice, puis fusionnés dans l'ordre (voir fodt_merge.py).
+
+Les renvois qui traversent deux morceaux sont résolus au découpage :
+un <xref> vers un autre morceau devient un <link> portant le titre de la
+cible, et un <footnoteref> devient une copie de la note référencée.
+
+Le DocBook est lu en flux (deux passes iterparse) : la taille des unités
+est estimée sans sérialisation, et seule une division de premier niveau à
+la fois est en mémoire.
+
+Usage :
+    python docbook_shards.py [--outdir RÉPERTOIRE] DOCBOOK NOMBRE
+"""
+
+from pathlib import Path
+import argparse
+import copy
+import io
+import sys
+import xml.etree.ElementTree as ET
+
+DOCBOOK_NS = 'http://docbook.org/ns/docbook'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+XML_ID = '{http://www.w3.org/XML/1998/namespace}id'
+
+# Divisions de premier niveau sur lesquelles le document peut être coupé
+DIVISIONS = {
+    'part', 'chapter', 'preface', 'appendix', 'section', 'article', 'reference',
+    'glossary', 'bibliography', 'index', 'colophon', 'dedication', 'acknowledgements',
+}
+
+
+# Texte provisoire de la racine, remplacé par le contenu de chaque morceau
+SHELL_MARKER = 'contenu_du_morceau784567'
+# Paragraphes repères qui encadrent le contenu d'un morceau rendu en odt
+FRAGMENT_START = 'debut_de_morceau784567'
+FRAGMENT_END = 'fin_de_morceau784567'
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+
+def _qname(name):
+    return f'{{{DOCBOOK_NS}}}{name}'
+
+
+# ---------------------------------------------------------------------------
+# Découpage
+# ---------------------------------------------------------------------------
+def _open(source):
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _size(element):
+    """Taille approximative de `element` sérialisé, hors enfants."""
+    return (len(element.text or '') + len(element.tail or '') + 2 * len(_local(element.tag))
+            + sum(len(k) + len(v) + 4 for k, v in element.attrib.items()) + 5)
+
+
+def _group(sizes, count):
+    """
+    Répartit les unités consécutives de tailles `sizes` en au plus `count`
+    groupes de taille voisine. Renvoie le groupe de chaque unité.
+    """
+    target = sum(sizes) / max(count, 1)
+    groups, group, size = [], 0, 0
+    for unit_size in sizes:
+        if groups and size >= target and group < count - 1:
+            group, size = group + 1, 0
+        groups.append(group)
+        size += unit_size
+    return groups
+
+
+def _label(element, linkend):
+    """Texte d'un renvoi vers `element`, comme pandoc le calcule pour un <xref>."""
+    if element.get('xreflabel'):
+        return element.get('xreflabel')
+    title = element.find(_qname('title'))
+    if title is None:
+        title = element.find(f"{_qname('info')}/{_qname('title')}")
+    if title is not None:
+        return ''.join(title.itertext()).strip()
+    return f'[{linkend}]'
+
+
+def _scan(source):
+    """
+    Première lecture, en flux : taille de chaque unité insécable (le
+    préambule, puis une unité par division de premier niveau), unité de
+    chaque identifiant, texte des renvois et copie des notes de bas de page.
+    """
+    sizes, owner, labels, footnotes = [], {}, {}, {}
+    root, depth = None, 0
+    for event, element in ET.iterparse(_open(source), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            elif depth == 1 and (not sizes or _local(element.tag) in DIVISIONS):
+                sizes.append(0)
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            break
+        sizes[-1] += _size(element)
+        element_id = element.get(XML_ID)
+        if element_id:
+            owner[element_id] = len(sizes) - 1
+            labels[element_id] = _label(element, element_id)
+            if _local(element.tag) == 'footnote':
+                footnotes[element_id] = copy.deepcopy(element)
+        if depth == 1:
+            root.remove(element)
+    return sizes, owner, labels, footnotes
+
+
+def _resolve_cross_references(top, group, owner, labels, footnotes):
+    """Remplace dans `top` les renvois dont la cible est dans un autre groupe."""
+    for parent in top.iter():
+        for position, child in enumerate(list(parent)):
+            linkend = child.get('linkend')
+            if linkend is None or owner.get(linkend, group) == group:
+                continue
+            if _local(child.tag) == 'xref':
+                replacement = ET.Element(_qname('link'), {'linkend': linkend})
+                replacement.text = labels[linkend]
+            elif _local(child.tag) == 'footnoteref' and linkend in footnotes:
+                replacement = copy.deepcopy(footnotes[linkend])
+                replacement.attrib.pop(XML_ID, None)
+            else:
+                continue
+            replacement.tail = child.tail
+            parent.remove(child)
+            parent.insert(position, replacement)
+
+
+def split(source, count):
+    """
+    Découpe le DocBook `source` (chemin ou contenu en octets) en au plus
+    `count` morceaux. Renvoie la liste des morceaux, sérialisés en UTF-8.
+
+    Le document est lu deux fois en flux : seule une division de premier
+    niveau à la fois est construite en mémoire, et sérialisée une seule fois.
+    """
+    ET.register_namespace('', DOCBOOK_NS)
+    ET.register_namespace('xl', XLINK_NS)
+    sizes, unit_owner, labels, footnotes = _scan(source)
+    unit_groups = _group(sizes, count)
+    owner = {element_id: unit_groups[unit] for element_id, unit in unit_owner.items()}
+
+    parts = [[] for _ in range(max(unit_groups, default=0) + 1)]
+    root, depth, unit = None, 0, -1
+    for event, element in ET.iterparse(_open(source), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            elif depth == 1 and (unit < 0 or _local(element.tag) in DIVISIONS):
+                unit += 1
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            group = unit_groups[unit]
+            _resolve_cross_references(element, group, owner, labels, footnotes)
+            parts[group].append(ET.tostring(element, encoding='utf-8', xml_declaration=False))
+            root.remove(element)
+
+    # balises de la racine, communes à tous les morceaux
+    shell = ET.Element(root.tag, root.attrib)
+    shell.text = SHELL_MARKER
+    head, tail = ET.tostring(shell, encoding='utf-8', xml_declaration=True).split(SHELL_MARKER.encode())
+    return [head + b''.join(group) + tail for group in parts]
+
+
+# ---------------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Découpe un DocBook en morceaux au niveau des chapitres")
+    parser.add_argument("source", help="Fichier DocBook")
+    parser.add_argument("count", type=int, help="Nombre maximal de morceaux")
+    parser.add_argument("--outdir", default=".", help="Répertoire de sortie")
+    args = parser.parse_args()
+
+    if args.count < 1:
+        sys.exit("Erreur : le nombre de morceaux doit être positif.")
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    stem = Path(args.source).stem
+    for index, shard in enumerate(split(args.source, args.count), 1):
+        target = outdir / f"{stem}.{index:03d}.xml"
+        target.write_bytes(shard)
+        print(target)
+
+
+if __name__ == "__main__":
+    main()
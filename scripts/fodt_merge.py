@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+fodt_merge.py – Réunit en un seul fodt les fodt des morceaux d'un document.
+
+Avec --shards, chaque morceau du DocBook est rendu par pandoc sous le modèle
+de l'entreprise puis converti en fodt par LibreOffice, en parallèle ; son
+contenu est encadré par deux paragraphes repères (docbook_shards.FRAGMENT_START
+et FRAGMENT_END). Le premier fodt, qui porte la page de titre, les tables
+et la table des matières du modèle, reçoit à la place de son repère de fin
+le contenu des suivants :
+    - les styles automatiques utilisés par leur contenu sont renommés
+      (préfixe m2_, m3_...) et ajoutés, puis les styles identiques
+      fusionnés (dedup_styles.py) ;
+    - les styles communs et les polices absents du premier fodt sont ajoutés ;
+    - les identifiants propres à un fodt (notes, tableaux, cadres, listes)
+      sont préfixés de la même façon.
+
+La numérotation des titres et des notes est recalculée par LibreOffice à
+l'ouverture ; la table des matières l'est par la macro UpdateIndexes,
+lancée sur le document réuni.
+
+Usage :
+    python fodt_merge.py <fichier_sortie.fodt> <morceau1.fodt> <morceau2.fodt> ...
+"""
+
+import re
+import sys
+
+try:
+    from . import dedup_styles, docbook_shards, fodt_scan
+except ImportError:
+    import dedup_styles
+    import docbook_shards
+    import fodt_scan
+
+# Éléments de premier niveau d'une section (styles, polices)
+ELEMENT_RE = re.compile(r'[ \t]*<([\w:.-]+)\b([^>]*?)(?:/>|>.*?</\1>)[ \t]*\n?', re.DOTALL)
+NAME_RE = re.compile(r'\bstyle:name="([^"]+)"')
+# Noms de styles : définitions et toutes les références (*style-name)
+STYLE_NAME_RE = re.compile(r'\b(style:name|[\w-]+:[\w-]*style-name)="([^"]+)"')
+# Identifiants uniques dans un document
+IDENTIFIER_RE = re.compile(r'\b(text:id|table:name|draw:name|xml:id|text:continue-list)="([^"]+)"')
+REFERENCE_TAG_RE = re.compile(r'<text:(?:note-ref|sequence-ref|sequence)\b[^>]*>')
+REF_NAME_RE = re.compile(r'\btext:ref-name="([^"]+)"')
+
+
+def _marker_re(text):
+    """Paragraphe repère `text`, éventuellement entouré de balises par LibreOffice."""
+    return re.compile(r'[ \t]*<text:p\b[^>/]*>(?:<[^/][^>]*>)*' + re.escape(text)
+                      + r'(?:</[^>]*>)*</text:p>[ \t]*\n?')
+
+
+FRAGMENT_START_RE = _marker_re(docbook_shards.FRAGMENT_START)
+FRAGMENT_END_RE = _marker_re(docbook_shards.FRAGMENT_END)
+
+
+def _region(content, tag):
+    """Contenu de la section <`tag`> de `content`, vide si absente."""
+    start = content.find(f'<{tag}>')
+    if start < 0:
+        return ''
+    start += len(tag) + 2
+    return content[start:content.index(f'</{tag}>', start)]
+
+
+def _append(content, tag, elements):
+    """Ajoute `elements` à la fin de la section <`tag`> de `content`."""
+    if not elements:
+        return content
+    close = f'</{tag}>'
+    position = content.index(close)
+    return content[:position] + ''.join(elements) + content[position:]
+
+
+def _names(region):
+    return {(match.group(1), name) for match in ELEMENT_RE.finditer(region)
+            for name in NAME_RE.findall(match.group(2))[:1]}
+
+
+def _missing(region, known):
+    """Éléments nommés de `region` absents de `known` (ensemble mis à jour)."""
+    elements = []
+    for match in ELEMENT_RE.finditer(region):
+        names = NAME_RE.findall(match.group(2))
+        if names and (match.group(1), names[0]) not in known:
+            known.add((match.group(1), names[0]))
+            elements.append(match.group(0))
+    return elements
+
+
+def _definitions(region):
+    """Styles automatiques de `region`, par nom (hors mises en page)."""
+    definitions = {}
+    for match in ELEMENT_RE.finditer(region):
+        names = NAME_RE.findall(match.group(2))
+        if names and match.group(1) != 'style:page-layout':
+            definitions[names[0]] = match.group(0)
+    return definitions
+
+
+def _used(body, definitions):
+    """Styles de `definitions` utilisés par `body`, directement ou par leurs parents, dans l'ordre."""
+    used, pending = set(), [body]
+    while pending:
+        for _, name in STYLE_NAME_RE.findall(pending.pop()):
+            if name in definitions and name not in used:
+                used.add(name)
+                pending.append(definitions[name])
+    return [name for name in definitions if name in used]
+
+
+def _body(content, path):
+    """Contenu d'un morceau, entre ses deux paragraphes repères."""
+    start = FRAGMENT_START_RE.search(content)
+    end = FRAGMENT_END_RE.search(content, start.end()) if start else None
+    if end is None:
+        raise ValueError(f"repères de morceau introuvables dans {path}")
+    return content[start.end():end.start()]
+
+
+def _prefixed(text, prefix, styles):
+    """`text` avec les styles `styles` et les identifiants préfixés par `prefix`."""
+    text = STYLE_NAME_RE.sub(
+        lambda m: f'{m.group(1)}="{prefix}{m.group(2)}"' if m.group(2) in styles else m.group(0), text)
+    text = IDENTIFIER_RE.sub(lambda m: f'{m.group(1)}="{prefix}{m.group(2)}"', text)
+    return REFERENCE_TAG_RE.sub(
+        lambda tag: REF_NAME_RE.sub(lambda m: f'text:ref-name="{prefix}{m.group(1)}"', tag.group(0)),
+        text)
+
+
+def merge(contents, names=None):
+    """
+    Réunit les textes de fodt `contents` (images mises de côté par
+    fodt_scan.read()) dans l'ordre. `names` sert aux messages d'erreur.
+    Renvoie le texte du document réuni.
+    """
+    names = names or [f"morceau {index}" for index in range(1, len(contents) + 1)]
+    first = contents[0]
+    _body(first, names[0])
+    first = FRAGMENT_START_RE.sub('', first, count=1)
+
+    known_styles = _names(_region(first, 'office:styles'))
+    known_fonts = _names(_region(first, 'office:font-face-decls'))
+    bodies, automatic, common, fonts = [], [], [], []
+    for index, (content, name) in enumerate(zip(contents[1:], names[1:]), 2):
+        prefix = f'm{index}_'
+        definitions = _definitions(_region(content, 'office:automatic-styles'))
+        body = _body(content, name)
+        styles = set(definitions)
+        bodies.append(_prefixed(body, prefix, styles))
+        automatic += [_prefixed(definitions[style], prefix, styles) for style in _used(body, definitions)]
+        common += _missing(_region(content, 'office:styles'), known_styles)
+        fonts += _missing(_region(content, 'office:font-face-decls'), known_fonts)
+
+    end = FRAGMENT_END_RE.search(first)
+    merged = first[:end.start()] + ''.join(bodies) + first[end.end():]
+    merged = _append(merged, 'office:font-face-decls', fonts)
+    merged = _append(merged, 'office:styles', common)
+    merged = _append(merged, 'office:automatic-styles', automatic)
+    merged, _ = dedup_styles.deduplicate(merged)
+    return merged
+
+
+def merge_files(paths, output):
+    """Réunit les fodt `paths` dans `output`. Renvoie `output`."""
+    store = fodt_scan.BinaryStore()
+    contents = [fodt_scan.read(path, store) for path in paths]
+    fodt_scan.write(output, merge(contents, [str(path) for path in paths]), store)
+    return output
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python3 fodt_merge.py <fichier_sortie.fodt> <morceau1.fodt> <morceau2.fodt> ...")
+        sys.exit(1)
+
+    try:
+        merge_files(sys.argv[2:], sys.argv[1])
+    except ValueError as e:
+        sys.exit(f"Erreur : {e}")
+    print(f"{len(sys.argv) - 2} morceaux réunis : {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
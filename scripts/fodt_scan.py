@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+fodt_scan.py – Lecture et écriture de fodt sans parcourir les images embarquées.
+
+Un fodt embarque chaque image en base64 dans un élément
+<office:binary-data>, souvent l'essentiel des octets d'un modèle.
+read() met ces contenus de côté dans un BinaryStore et laisse à leur place
+une courte référence ; style.py, template.py, parse.py et dedup_styles.py ne
+travaillent donc que sur le texte du document. write() réinsère les
+contenus au moment de l'écriture.
+
+Les régions binaires sont repérées par simple recherche de la balise
+fermante (str.find), sans expression régulière sur le base64. Les images
+identiques ne sont conservées qu'une fois.
+
+Usage :
+    python fodt_scan.py <fichier.fodt>     (statistiques texte / binaire)
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+OPEN_TAG = '<office:binary-data>'
+CLOSE_TAG = '</office:binary-data>'
+REFERENCE_PREFIX = 'fodt-binary:'
+# le base64 ne contient ni ':' ni '-' : une référence ne peut pas être confondue avec une image
+REFERENCE_RE = re.compile(re.escape(OPEN_TAG + REFERENCE_PREFIX) + r'([0-9a-f]+)' + re.escape(CLOSE_TAG))
+
+
+class BinaryStore:
+    """
+    Contenus des <office:binary-data> retirés d'un document, indexés par
+    leur empreinte. Gardés en mémoire, ou dans des fichiers de `directory`
+    si précisé.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._payloads = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def size(self):
+        """Taille cumulée des contenus, en caractères."""
+        return sum(self._payloads.values()) if self.directory else sum(map(len, self._payloads.values()))
+
+    def put(self, payload):
+        key = hashlib.sha1(payload.encode('ascii', 'replace')).hexdigest()
+        if key not in self._payloads:
+            if self.directory:
+                with open(os.path.join(self.directory, f"{key}.b64"), 'w', encoding='ascii',
+                          errors='replace') as f:
+                    f.write(payload)
+                self._payloads[key] = len(payload)
+            else:
+                self._payloads[key] = payload
+        return key
+
+    def get(self, key):
+        if self.directory:
+            with open(os.path.join(self.directory, f"{key}.b64"), 'r', encoding='ascii') as f:
+                return f.read()
+        return self._payloads[key]
+
+
+def externalize(content, store):
+    """Remplace le contenu de chaque <office:binary-data> de `content` par une référence."""
+    parts = []
+    position = 0
+    while True:
+        start = content.find(OPEN_TAG, position)
+        if start < 0:
+            break
+        start += len(OPEN_TAG)
+        end = content.find(CLOSE_TAG, start)
+        if end < 0:
+            break
+        parts.append(content[position:start])
+        parts.append(REFERENCE_PREFIX + store.put(content[start:end]))
+        position = end
+    if not parts:
+        return content
+    parts.append(content[position:])
+    return ''.join(parts)
+
+
+def inline(text, store):
+    """Réinsère dans `text` les contenus référencés."""
+    return REFERENCE_RE.sub(lambda m: OPEN_TAG + store.get(m.group(1)) + CLOSE_TAG, text)
+
+
+def read(path, store):
+    """Texte du fodt `path`, images mises de côté dans `store`."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return externalize(f.read(), store)
+
+
+def write(path, text, store):
+    """Écrit `text` dans `path` en réinsérant les images de `store` au fil de l'écriture."""
+    with open(path, 'w', encoding='utf-8') as f:
+        position = 0
+        for match in REFERENCE_RE.finditer(text):
+            f.write(text[position:match.start()])
+            f.write(OPEN_TAG)
+            f.write(store.get(match.group(1)))
+            f.write(CLOSE_TAG)
+            position = match.end()
+        f.write(text[position:])
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 fodt_scan.py <fichier.fodt>")
+        sys.exit(1)
+
+    store = BinaryStore()
+    text = read(sys.argv[1], store)
+    print(f"{sys.argv[1]} : {len(text)} caractères de texte, "
+          f"{len(store)} images distinctes ({store.size()} caractères de base64)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+generate.py – Point d'entrée unique `asciidoc-generate`.
+
+Usage :
+    asciidoc-generate generate [OPTIONS] FICHIER         (generate.sh)
+    asciidoc-generate tree [-r] [RACINE]                 (asc_tree.py)
+    asciidoc-generate clean-template [OPTIONS] FICHIER   (clean_template.sh)
+    asciidoc-generate translate ENTRÉE SORTIE [OPTIONS]  (translate.py)
+
+Le module n'importe rien de coûteux au démarrage : chaque sous-commande
+n'importe son module (et ses dépendances, litellm par exemple) qu'au moment
+de son exécution. `make check_startup` contrôle ce budget de démarrage.
+"""
+
+import os
+import sys
+from importlib import import_module
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# sous-commande : (script shell ou module python, description)
+COMMANDS = {
+    'generate': ('generate.sh', "Génère les documents (odt, docx, pdf...) d'un fichier Asciidoctor"),
+    'tree': ('asc_tree', "Affiche l'arbre des directives include::"),
+    'clean-template': ('clean_template.sh', "Prépare style.fodt et template.fodt depuis un modèle"),
+    'translate': ('translate', "Traduit un document Asciidoctor du français vers l'anglais"),
+}
+
+
+def usage(out=sys.stdout):
+    print("Usage : asciidoc-generate <commande> [arguments...]\n", file=out)
+    print("Commandes :", file=out)
+    for name, (_, description) in COMMANDS.items():
+        print(f"  {name:<16}{description}", file=out)
+    print("\n`asciidoc-generate <commande> --help` détaille les options d'une commande.", file=out)
+
+
+def _module(name):
+    """Importe un module voisin, que le script soit lancé seul ou comme paquet."""
+    if __package__:
+        return import_module(f"{__package__}.{name}")
+    if SCRIPT_DIR not in sys.path:
+        sys.path.insert(0, SCRIPT_DIR)
+    return import_module(name)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        usage()
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Erreur : commande inconnue '{command}'.\n", file=sys.stderr)
+        usage(sys.stderr)
+        return 1
+
+    target = COMMANDS[command][0]
+    if target.endswith('.sh'):
+        script = os.path.join(SCRIPT_DIR, target)
+        os.execvp('bash', ['bash', script, *args])
+
+    # les modules python lisent leurs arguments dans sys.argv
+    sys.argv = [f"asciidoc-generate {command}", *args]
+    return _module(target).main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
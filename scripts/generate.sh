@@ -12,8 +12,7 @@
 # Installation for epub3 generation
 # gem install asciidoctor-epub3
 
-# Installation for reducer to generate a flat asciidoctor document for AI purpose
-# gem install asciidoctor-reducer
+# The flat asciidoctor document for AI purpose is produced by asc_flatten.py: asciidoctor-reducer is no longer needed
 
 # This program generates from an  initial asciidoctor file https://docs.asciidoctor.org/asciidoc/latest/ (and all dependencies), An openoffice document, A PDF file conform with company templates, a revision history, an approval zone and an updated table of content.
 # Source document supports image integration but also asciidoctor diagrams https://docs.asciidoctor.org/diagram-extension/latest/
@@ -28,6 +27,11 @@ template_dir=`realpath "$prog_dirname"/../template`
 medias_dir=`realpath "$prog_dirname"/../medias`
 outdir=`realpath .`
 testf=n
+files=()
+# all output formats by default
+formats=odt,docx,pdf,fodt,adoc,rst
+# chapter-level sharding: pieces rendered and converted in parallel, then merged (0: disabled)
+shards=0
 if [[ -r "$outdir/.env" ]]; then
 	. "$outdir/.env"
 fi
@@ -44,88 +48,64 @@ for arg in "$@"; do
     --ofile=*)
       ofile="${arg#*=}"
       ;;
+    --formats=*)
+      formats="${arg#*=}"
+      ;;
+    --shard)
+      shards=`nproc`
+      ;;
+    --shard=*)
+      shards="${arg#*=}"
+      ;;
     --test)
       testf=y
       ;;
+    -h|--help)
+      echo "Usage : $0 [--ofile=<file>] [--template=<dir>] [--outdir=<dir>] [--formats=pdf,docx,...] [--shard[=<n>]] <filename> [<filename>...]"
+      exit 0
+      ;;
     *)
-      if [[ -z "$file" ]]; then
-        file="$arg"
-      else
-        echo "Erreur : Trop d'arguments non optionnels fournis."
-        exit 1
-      fi
+      files+=("$arg")
       ;;
   esac
 done
 
 # Vérification de l'argument obligatoire
-if [[ -z "$file" ]]; then
+if [[ ${#files[@]} -eq 0 ]]; then
   echo "Erreur : Un nom de fichier doit être fourni."
-  echo "Usage : $0 [--ofile=<file>] [--template=<dir>] [--outdir=<dir>] <filename>"
+  echo "Usage : $0 [--ofile=<file>] [--template=<dir>] [--outdir=<dir>] [--formats=pdf,docx,...] [--shard[=<n>]] <filename> [<filename>...]"
+  exit 1
+fi
+if [[ -n "$ofile" && ${#files[@]} -gt 1 ]]; then
+  echo "Erreur : --ofile n'est utilisable qu'avec un seul fichier."
   exit 1
 fi
 
-file=`realpath "$file"`
+for i in "${!files[@]}"; do
+  files[$i]=`realpath "${files[$i]}"`
+done
 outdir=`realpath "$outdir"`
-ofile=${ofile:-$file}
-ofile=`basename "$ofile"`
-ofile=$outdir/${ofile%%.*}
+# output names default to each source basename (done by pipeline.py)
+name_opt=()
+if [[ -n "$ofile" ]]; then
+  ofile=`basename "$ofile"`
+  name_opt=(--name="${ofile%%.*}")
+fi
 template_dir=`realpath "$template_dir"`
 
 mkdir -p "$outdir"
 echo $outdir
-# first generate diagrams, code highlighting, link to images and a docbook
-asciidoctor -D"$outdir" -r asciidoctor-diagram -a companyname="$COMPANY_NAME" -a legacyname="$LEGACY_NAME" -a newname="$NEW_NAME" -a allow-uri-read -a source-highlighter=rouge -b docbook -o "$ofile.xml" "$file"
-# 20/12/2024: bug in asciidoctor which generates attributes not compatible with pandoc docbook input filter
-sed -i 's/contentwidth/width/g' "$ofile.xml"
-sed -i 's/contentdepth/depth/g' "$ofile.xml"
-sed -i 's|fileref="\([^"]*\)"|fileref="'$outdir'/\1"|g' "$ofile.xml"
-# prepare document for pandoc. Suppress first <simpara> element if any which contains elements not part of the output file
-
-awk 'BEGIN { found=0 }
-	 /<section/ && !found { found=1 }
-     /<simpara>/ && !found { found=1; toskip=1; next }
-     toskip && /<\/simpara>/ { toskip=0; next }
-     { if (!toskip) print }' "$ofile.xml" | sed 's/<?asciidoc-pagebreak?>/saut_de_page784567/g' > "$outdir"/temporary_file.xml
 
+test_opt=""
 if [[ $testf = y ]]; then
-pandoc -f docbook -t odt -L $prog_dirname/admonition.lua --reference-doc="$template_dir"/frame.odt "$outdir"/temporary_file.xml -o "$ofile.odt"
-else
-pandoc -f docbook -t odt -L $prog_dirname/admonition.lua --template="$template_dir"/template.fodt --reference-doc="$template_dir"/style.odt "$outdir"/temporary_file.xml -o "$ofile.odt"
+  test_opt="--test"
 fi
 
-loffice --headless --invisible --convert-to fodt --outdir "$outdir" "$ofile.odt"
-
-# treat fields in fodt file from xml: title, author, signature table, revision table
-
-$prog_dirname/parse.py "$ofile.xml" "$ofile.fodt" "$outdir"/output.fodt
-mv "$outdir"/output.fodt "$ofile.fodt"
-
-if [[ $testf = n ]]; then
-# Copy Table format from TemplateTable
-loffice  --headless --invisible "vnd.sun.star.script:Standard.module1.CopyFormattingFromTemplate?language=Basic&location=document" "$ofile.fodt"
-#loffice  "vnd.sun.star.script:Standard.module1.CopyFormattingFromTemplate?language=Basic&location=document" "$ofile.fodt"
-# calculate Table of Content
-loffice  --headless --invisible "vnd.sun.star.script:Standard.module1.UpdateIndexes?language=Basic&location=document" "$ofile.fodt"
-fi
-
-
-# generate output documents
-loffice --headless --invisible --convert-to odt --outdir "$outdir" "$ofile.fodt"
-loffice --headless --invisible --convert-to docx --outdir "$outdir" "$ofile.fodt"
-loffice --headless --invisible --convert-to pdf --outdir "$outdir" "$ofile.odt"
-
-# generate a flat asciidoctor file for AI. extension is adoc to indicate chatgpt that this document is an asciidoc
-asciidoctor-reducer -o "$ofile.adoc"  -a companyname="$COMPANY_NAME" -a legacyname="$LEGACY_NAME" -a newname="$NEW_NAME" "$file"
-
-# generate rst file for readthedocs site
-pandoc -f docbook -t rst "$outdir"/temporary_file.xml -o "$ofile".tmp
-echo '
-.. toctree::
-   :maxdepth: 2
-   :caption: Table des matières
-
-' > "$ofile".rst
-cat "$ofile".tmp >> "$ofile".rst
-
-rm "$ofile.xml" "$outdir"/temporary_file.xml "$ofile".tmp
+# asciidoctor (docbook with diagrams and code highlighting), flat adoc for AI (asc_flatten.py),
+# preparation of the docbook, pandoc, parse.py and LibreOffice are chained by pipeline.py:
+# the docbook goes from asciidoctor to pandoc through pipes, the remaining intermediate files
+# live in a per-run tmpfs scratch directory and only the requested documents are moved to the outdir;
+# with several files, one asciidoctor process is shared by all of them
+exec python3 $prog_dirname/pipeline.py --outdir="$outdir" "${name_opt[@]}" --template-dir="$template_dir" \
+  --formats="$formats" --shards="$shards" $test_opt \
+  -a companyname="$COMPANY_NAME" -a legacyname="$LEGACY_NAME" -a newname="$NEW_NAME" "${files[@]}"
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+lo_export.py – Exporte un document LibreOffice dans plusieurs formats en un seul chargement.
+
+Usage :
+    python lo_export.py [--outdir RÉPERTOIRE] DOCUMENT FORMAT [FORMAT ...]
+
+Une seule instance LibreOffice sans interface est lancée ; le document est
+chargé une fois puis enregistré dans chacun des formats demandés, au lieu
+d'un `loffice --convert-to` (et donc d'un démarrage et d'un chargement)
+par format.
+
+Nécessite le module Python `uno` fourni par LibreOffice (paquet python3-uno,
+ou l'interpréteur program/python livré avec LibreOffice) ; il n'est importé
+qu'au lancement de l'export, ce qui permet à pipeline.py de reprendre
+office_binary() sans lui.
+Le programme LibreOffice utilisé est `loffice`, ou celui de la variable LOFFICE.
+--profile fait travailler LibreOffice sur un profil utilisateur dédié, ce
+qui permet plusieurs exports simultanés.
+"""
+
+from pathlib import Path
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# Modules uno, importés par load_uno()
+uno = PropertyValue = NoConnectException = None
+
+# Filtres d'export LibreOffice par extension
+FILTERS = {
+    'odt': 'writer8',
+    'fodt': 'OpenDocument Text Flat XML',
+    'docx': 'MS Word 2007 XML',
+    'doc': 'MS Word 97',
+    'pdf': 'writer_pdf_Export',
+    'rtf': 'Rich Text Format',
+    'html': 'HTML (StarWriter)',
+    'txt': 'Text',
+}
+
+
+# ---------------------------------------------------------------------------
+# Instance LibreOffice
+# ---------------------------------------------------------------------------
+def load_uno():
+    """Importe les modules uno de LibreOffice ; quitte s'ils sont introuvables."""
+    global uno, PropertyValue, NoConnectException
+    try:
+        import uno
+        from com.sun.star.beans import PropertyValue
+        from com.sun.star.connection import NoConnectException
+    except ImportError:
+        sys.exit("Erreur : le module Python 'uno' de LibreOffice est introuvable.")
+
+
+def _property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def office_binary():
+    """Programme LibreOffice à lancer."""
+    return os.environ.get('LOFFICE') or shutil.which('loffice') or 'soffice'
+
+
+def start_office(pipe_name, profile=None):
+    """
+    Lance LibreOffice sans interface, à l'écoute sur le tube `pipe_name`,
+    sur le profil utilisateur `profile` s'il est précisé.
+    """
+    cmd = [office_binary()]
+    if profile:
+        cmd.append(f"-env:UserInstallation={Path(profile).resolve().as_uri()}")
+    cmd += ['--headless', '--invisible', '--norestore', '--nologo', '--nodefault',
+            f'--accept=pipe,name={pipe_name};urp;StarOffice.ComponentContext']
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def connect(pipe_name, process, timeout=60):
+    """Se connecte à l'instance lancée et renvoie son Desktop."""
+    local = uno.getComponentContext()
+    resolver = local.ServiceManager.createInstanceWithContext(
+        'com.sun.star.bridge.UnoUrlResolver', local)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ctx = resolver.resolve(f'uno:pipe,name={pipe_name};urp;StarOffice.ComponentContext')
+            return ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+        except NoConnectException:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+def export(desktop, document, outdir, formats):
+    """
+    Charge `document` une fois et l'enregistre dans `outdir` pour chaque
+    format de `formats`. Renvoie la liste des fichiers écrits.
+    """
+    document = Path(document).resolve()
+    url = uno.systemPathToFileUrl(str(document))
+    doc = desktop.loadComponentFromURL(url, '_blank', 0, (_property('Hidden', True),))
+    if doc is None:
+        raise RuntimeError(f"impossible de charger {document}")
+    written = []
+    try:
+        for fmt in formats:
+            target = Path(outdir).resolve() / f"{document.stem}.{fmt}"
+            if target == document:
+                continue
+            doc.storeToURL(uno.systemPathToFileUrl(str(target)),
+                           (_property('FilterName', FILTERS[fmt]), _property('Overwrite', True)))
+            written.append(target)
+    finally:
+        doc.close(True)
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporte un document LibreOffice dans plusieurs formats en un seul chargement")
+    parser.add_argument("document", help="Document à exporter (.fodt, .odt...)")
+    parser.add_argument("formats", nargs="+", choices=sorted(FILTERS),
+                        help="Formats de sortie")
+    parser.add_argument("--outdir", default=None,
+                        help="Répertoire de sortie (défaut : celui du document)")
+    parser.add_argument("--profile", default=None,
+                        help="Profil utilisateur LibreOffice dédié (défaut : profil de l'utilisateur)")
+    args = parser.parse_args()
+    load_uno()
+
+    outdir = args.outdir or os.path.dirname(os.path.abspath(args.document))
+    pipe_name = f"lo_export_{os.getpid()}"
+    process = start_office(pipe_name, args.profile)
+    try:
+        desktop = connect(pipe_name, process)
+        try:
+            for target in export(desktop, args.document, outdir, args.formats):
+                print(f"convert {args.document} -> {target}")
+        finally:
+            try:
+                desktop.terminate()
+            except Exception:
+                # la connexion est coupée quand LibreOffice s'arrête
+                pass
+    except Exception as e:
+        sys.exit(f"Erreur lors de l'export de {args.document} : {e}")
+    finally:
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == "__main__":
+    main()
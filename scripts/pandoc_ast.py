@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+pandoc_ast.py – Lit le DocBook une seule fois et produit toutes les sorties pandoc.
+
+Usage :
+    python pandoc_ast.py [OPTIONS] DOCBOOK --outbase BASE --targets odt,rst[,html,md]
+
+Le DocBook est converti une fois en AST pandoc (JSON). Les filtres Lua ne
+sont appliqués qu'une fois par combinaison de filtres. Les AST sont mis en
+cache, indexés par l'empreinte du fichier d'entrée, de la version de pandoc
+et des filtres. Chaque cible est ensuite rendue depuis l'AST, en parallèle.
+
+Le cache est borné (512 Mo par défaut) : au-delà, les AST les moins
+récemment utilisés sont supprimés. Son emplacement et sa taille se règlent
+par --cache-dir / --cache-size-mb ou par les variables
+ASCIIDOC_GENERATOR_CACHE_DIR / ASCIIDOC_GENERATOR_CACHE_MB, par exemple
+vers un disque local lorsque le répertoire personnel est sur NFS ; une
+taille de 0 désactive le cache.
+
+Pour les très gros documents, --shards découpe le DocBook au niveau des
+chapitres (voir docbook_shards.py). Chaque morceau est lu, filtré et rendu
+en odt en parallèle (BASE.001.odt, BASE.002.odt...), son contenu encadré
+par deux paragraphes repères pour la fusion des fodt (fodt_merge.py). Les
+autres cibles sont rendues depuis les AST des morceaux, concaténés sans
+être décodés.
+
+Options :
+    --template FICHIER       Modèle pandoc de la sortie odt
+    --reference-doc FICHIER  Document de référence des styles de la sortie odt
+    --cache-dir RÉPERTOIRE   Répertoire du cache (défaut : ~/.cache/asciidoc_generator/ast)
+    --cache-size-mb N        Taille maximale du cache en Mo (défaut : 512, 0 : pas de cache)
+    --shards N               Rendu parallèle en N morceaux (0 : désactivé)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+
+try:
+    from . import docbook_shards
+except ImportError:
+    import docbook_shards
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Entête ajouté au fichier rst pour le site readthedocs
+RST_TOCTREE = """
+.. toctree::
+   :maxdepth: 2
+   :caption: Table des matières
+
+
+"""
+
+# Cibles de rendu : format pandoc, extension, filtres Lua appliqués à l'AST,
+# texte ajouté en tête de la sortie
+TARGETS = {
+    'odt': {'to': 'odt', 'ext': 'odt', 'filters': ('admonition.lua',), 'prefix': None},
+    'rst': {'to': 'rst', 'ext': 'rst', 'filters': (), 'prefix': RST_TOCTREE},
+    'html': {'to': 'html5', 'ext': 'html', 'filters': (), 'prefix': None},
+    'md': {'to': 'gfm', 'ext': 'md', 'filters': (), 'prefix': None},
+}
+
+
+DEFAULT_CACHE_MB = 512
+
+# Clé "blocks" de l'AST JSON : une chaîne JSON ne contient pas de guillemet
+# non échappé, la première occurrence est donc la clé du document
+BLOCKS_RE = re.compile(rb'"blocks"\s*:\s*\[')
+
+
+# ---------------------------------------------------------------------------
+# Cache des AST
+# ---------------------------------------------------------------------------
+def default_cache_dir():
+    if os.environ.get('ASCIIDOC_GENERATOR_CACHE_DIR'):
+        return Path(os.environ['ASCIIDOC_GENERATOR_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'asciidoc_generator' / 'ast'
+
+
+def default_cache_size_mb():
+    return int(os.environ.get('ASCIIDOC_GENERATOR_CACHE_MB', DEFAULT_CACHE_MB))
+
+
+@lru_cache(maxsize=None)
+def pandoc_version():
+    result = subprocess.run(['pandoc', '--version'], capture_output=True, check=True)
+    return result.stdout.splitlines()[0]
+
+
+def parse_docbook(source):
+    """AST JSON du DocBook `source` (chemin ou contenu en octets)."""
+    if isinstance(source, bytes):
+        return subprocess.run(['pandoc', '-f', 'docbook', '-t', 'json'],
+                              input=source, capture_output=True, check=True).stdout
+    return subprocess.run(['pandoc', '-f', 'docbook', '-t', 'json', str(source)],
+                          capture_output=True, check=True).stdout
+
+
+# ---------------------------------------------------------------------------
+# AST des morceaux
+# ---------------------------------------------------------------------------
+def _blocks(ast):
+    """Début et fin du contenu de la liste "blocks", dernière clé de l'AST JSON `ast`."""
+    return BLOCKS_RE.search(ast).end(), ast.rindex(b']')
+
+
+def merge_asts(asts):
+    """
+    AST JSON du document formé des AST `asts` mis bout à bout. Les listes de
+    blocs sont concaténées telles quelles, sans décoder le JSON ; les
+    métadonnées (<info>) sont celles du premier morceau.
+    """
+    first_start, first_end = _blocks(asts[0])
+    blocks = []
+    for ast in asts:
+        start, end = _blocks(ast)
+        if ast[start:end].strip():
+            blocks.append(ast[start:end])
+    return asts[0][:first_start] + b','.join(blocks) + asts[0][first_end:]
+
+
+def _marker(text):
+    return json.dumps({'t': 'Para', 'c': [{'t': 'Str', 'c': text}]}).encode('utf-8')
+
+
+def mark_fragment(ast):
+    """Encadre les blocs de l'AST JSON `ast` par les paragraphes repères des morceaux."""
+    start, end = _blocks(ast)
+    blocks = [_marker(docbook_shards.FRAGMENT_START), _marker(docbook_shards.FRAGMENT_END)]
+    if ast[start:end].strip():
+        blocks.insert(1, ast[start:end])
+    return ast[:start] + b','.join(blocks) + ast[end:]
+
+
+class AstCache:
+    """
+    AST pandoc indexés par l'empreinte de l'entrée et des filtres appliqués.
+    Le répertoire est limité à `max_bytes` octets (les AST les moins récemment
+    utilisés sont supprimés) ; avec max_bytes=0, rien n'est écrit sur disque.
+    """
+
+    def __init__(self, cache_dir, source, max_bytes=None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = default_cache_size_mb() << 20 if max_bytes is None else max_bytes
+        self._memory = {}
+        digest = hashlib.sha256(pandoc_version())
+        if isinstance(source, bytes):
+            digest.update(source)
+        else:
+            with open(source, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        self.source = source
+        self.source_hash = digest.hexdigest()
+
+    def _path(self, filters):
+        digest = hashlib.sha256(self.source_hash.encode())
+        for name in filters:
+            digest.update(b'\0' + name.encode())
+            digest.update((SCRIPT_DIR / name).read_bytes())
+        return self.cache_dir / f"{digest.hexdigest()}.json"
+
+    def _store(self, path, data):
+        self._memory[path] = data
+        if not self.max_bytes:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self._prune(keep=path)
+
+    def _prune(self, keep):
+        """Supprime les AST les moins récemment utilisés au-delà de max_bytes."""
+        entries = []
+        for entry in self.cache_dir.glob('*.json'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # supprimé par une autre génération
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def ast(self, filters=()):
+        """AST du document source après application de `filters`."""
+        path = self._path(filters)
+        if path in self._memory:
+            return self._memory[path]
+        if self.max_bytes and path.exists():
+            try:
+                data = path.read_bytes()
+                # date de dernier usage, pour l'éviction
+                os.utime(path)
+                return data
+            except FileNotFoundError:
+                # évincé entre-temps par une autre génération
+                pass
+        if filters:
+            cmd = ['pandoc', '-f', 'json', '-t', 'json']
+            for name in filters:
+                cmd += ['-L', str(SCRIPT_DIR / name)]
+            data = subprocess.run(cmd, input=self.ast(), capture_output=True, check=True).stdout
+        else:
+            data = parse_docbook(self.source)
+        self._store(path, data)
+        return data
+
+
+# ---------------------------------------------------------------------------
+# Rendu
+# ---------------------------------------------------------------------------
+def render(ast, target, output, options=()):
+    """Rend l'AST JSON `ast` au format de `target` dans le fichier `output`."""
+    spec = TARGETS[target]
+    cmd = ['pandoc', '-f', 'json', '-t', spec['to'], *options]
+    if spec['prefix'] is None:
+        subprocess.run(cmd + ['-o', str(output)], input=ast, check=True)
+    else:
+        result = subprocess.run(cmd, input=ast, capture_output=True, check=True)
+        with open(output, 'wb') as f:
+            f.write(spec['prefix'].encode('utf-8'))
+            f.write(result.stdout)
+    return output
+
+
+def render_sharded(source, outbase, targets, target_options, cache_dir, shards, max_bytes):
+    """
+    Comme render_all, en découpant `source` en `shards` morceaux lus et
+    filtrés en parallèle. La cible odt est rendue par morceau, en
+    `outbase`.001.odt, `outbase`.002.odt... (un seul `outbase`.odt si le
+    document ne se découpe pas) ; les autres depuis les AST concaténés.
+    """
+    pieces = docbook_shards.split(source, shards)
+    combinations = list(dict.fromkeys(TARGETS[t]['filters'] for t in targets))
+
+    def piece_asts(piece):
+        cache = AstCache(cache_dir, piece, max_bytes)
+        return {filters: cache.ast(filters) for filters in combinations}
+
+    with ThreadPoolExecutor(max_workers=len(pieces)) as pool:
+        asts = list(pool.map(piece_asts, pieces))
+
+    with ThreadPoolExecutor(max_workers=len(pieces) + len(targets)) as pool:
+        jobs = []
+        for target in targets:
+            spec = TARGETS[target]
+            options = target_options.get(target, ())
+            if target == 'odt' and len(asts) > 1:
+                jobs += [pool.submit(render, mark_fragment(piece[spec['filters']]), target,
+                                     f"{outbase}.{index:03d}.{spec['ext']}", options)
+                         for index, piece in enumerate(asts, 1)]
+            else:
+                jobs.append(pool.submit(render, merge_asts([piece[spec['filters']] for piece in asts]),
+                                        target, f"{outbase}.{spec['ext']}", options))
+        return [job.result() for job in jobs]
+
+
+def render_all(source, outbase, targets, target_options=None, cache_dir=None, shards=0,
+               cache_size_mb=None):
+    """
+    Produit `outbase`.<ext> pour chaque cible de `targets` à partir du DocBook
+    `source` (chemin ou contenu en octets), en ne lisant le DocBook qu'une fois.
+    Avec shards > 1, voir render_sharded. Renvoie les fichiers écrits.
+    """
+    target_options = target_options or {}
+    max_bytes = None if cache_size_mb is None else cache_size_mb << 20
+    cache_dir = cache_dir or default_cache_dir()
+    if shards > 1:
+        return render_sharded(source, outbase, targets, target_options, cache_dir, shards, max_bytes)
+    cache = AstCache(cache_dir, source, max_bytes)
+    # un AST par combinaison de filtres, calculé une seule fois
+    asts = {}
+    for target in targets:
+        filters = TARGETS[target]['filters']
+        if filters not in asts:
+            asts[filters] = cache.ast(filters)
+    with ThreadPoolExecutor(max_workers=len(targets) or 1) as pool:
+        jobs = [pool.submit(render, asts[TARGETS[t]['filters']], t,
+                            f"{outbase}.{TARGETS[t]['ext']}", target_options.get(t, ()))
+                for t in targets]
+        return [job.result() for job in jobs]
+
+
+# ---------------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convertit un DocBook en AST pandoc une seule fois et produit les sorties")
+    parser.add_argument("source", help="Fichier DocBook")
+    parser.add_argument("--outbase", required=True,
+                        help="Chemin des sorties, sans extension")
+    parser.add_argument("--targets", default="odt,rst",
+                        help=f"Cibles séparées par des virgules parmi {','.join(TARGETS)}")
+    parser.add_argument("--template", help="Modèle pandoc de la sortie odt")
+    parser.add_argument("--reference-doc", dest="reference_doc",
+                        help="Document de référence de la sortie odt")
+    parser.add_argument("--cache-dir", dest="cache_dir", default=None,
+                        help="Répertoire du cache des AST")
+    parser.add_argument("--cache-size-mb", dest="cache_size_mb", type=int, default=None,
+                        help=f"Taille maximale du cache en Mo (défaut : {DEFAULT_CACHE_MB}, 0 : pas de cache)")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Rendu parallèle en N morceaux découpés aux chapitres (0 : désactivé)")
+    args = parser.parse_args()
+
+    targets = [t for t in args.targets.split(',') if t]
+    unknown = [t for t in targets if t not in TARGETS]
+    if unknown:
+        sys.exit(f"Erreur : cible inconnue {', '.join(unknown)} (cibles possibles : {','.join(TARGETS)}).")
+
+    odt_options = []
+    if args.template:
+        odt_options.append(f"--template={args.template}")
+    if args.reference_doc:
+        odt_options.append(f"--reference-doc={args.reference_doc}")
+
+    try:
+        render_all(args.source, args.outbase, targets, {'odt': odt_options}, args.cache_dir, args.shards,
+                   args.cache_size_mb)
+    except subprocess.CalledProcessError as e:
+        sys.exit(f"Erreur : pandoc a échoué ({' '.join(e.cmd[:5])}...) : "
+                 f"{(e.stderr or b'').decode('utf-8', 'replace').strip()}")
+
+
+if __name__ == "__main__":
+    main()
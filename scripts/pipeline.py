@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+pipeline.py – Chaîne de génération appelée par generate.sh, sans fichiers intermédiaires.
+
+Le DocBook produit par asciidoctor n'est jamais écrit : le processus
+asciidoctor persistant le renvoie par son tube, la préparation pour pandoc
+(anciens sed/awk) se fait en mémoire et pandoc le lit sur son entrée
+standard. Les fichiers que les outils imposent (odt de pandoc, fodt de
+LibreOffice, exports) sont produits dans un répertoire de travail propre à
+l'exécution, sur tmpfs (/dev/shm) quand il existe, puis les documents
+demandés sont déplacés de façon atomique dans le répertoire de sortie.
+Plusieurs générations peuvent donc tourner en même temps dans un même
+répertoire.
+
+Avec --shards, pandoc rend un odt par morceau du document ; chaque morceau
+est converti en fodt, rempli et mis en forme (CopyFormattingFromTemplate)
+en parallèle, sur son propre profil LibreOffice, puis les fodt sont réunis
+(fodt_merge.py) avant la mise à jour de la table des matières et les exports.
+
+Avec plusieurs sources, un seul processus asciidoctor sert tous les
+documents ; il est recyclé après --max-jobs conversions ou si sa mémoire
+grossit trop (asciidoctor_worker.py). Une source en erreur n'arrête pas
+les suivantes.
+
+Usage :
+    python pipeline.py [OPTIONS] SOURCE [SOURCE...]
+
+Options :
+    --outdir RÉPERTOIRE     Répertoire de sortie (défaut : courant)
+    --name NOM              Nom des sorties, sans extension (une seule source)
+    --template-dir RÉP.     Répertoire des modèles (style.odt, template.fodt...)
+    --formats LISTE         Formats parmi odt,docx,pdf,fodt,adoc,rst,html,md
+    --shards N              Rendu parallèle du document en N morceaux
+    --test                  Modèle frame.odt, sans macros LibreOffice
+    --max-jobs N            Conversions avant recyclage du processus asciidoctor
+    -a, --attribute NOM=VALEUR
+
+Le répertoire de travail peut être imposé par la variable ASCIIDOC_GENERATOR_SCRATCH.
+LibreOffice y est lancé avec son propre profil utilisateur, pour ne pas
+dépendre d'une instance déjà ouverte sur le profil par défaut ; seules les
+macros des documents de ce répertoire sont autorisées.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import importlib.util
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+try:
+    from . import asc_flatten, asc_header, fodt_merge, fodt_scan, parse, pandoc_ast
+    from .asciidoctor_worker import AsciidoctorWorker, WorkerError
+    from .lo_export import office_binary
+except ImportError:
+    import asc_flatten
+    import asc_header
+    import fodt_merge
+    import fodt_scan
+    import parse
+    import pandoc_ast
+    from asciidoctor_worker import AsciidoctorWorker, WorkerError
+    from lo_export import office_binary
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+FORMATS = ('odt', 'docx', 'pdf', 'fodt', 'adoc', 'rst', 'html', 'md')
+DEFAULT_FORMATS = 'odt,docx,pdf,fodt,adoc,rst'
+OFFICE_FORMATS = ('odt', 'docx', 'pdf')
+PANDOC_FORMATS = ('rst', 'html', 'md')
+
+# Macros du modèle lancées sur le fodt : format des tableaux (sur chaque
+# morceau), table des matières (sur le document réuni)
+FRAGMENT_MACROS = ('CopyFormattingFromTemplate',)
+DOCUMENT_MACROS = ('UpdateIndexes',)
+
+# Réglages du profil LibreOffice de l'exécution : macros autorisées pour les
+# seuls documents du répertoire de travail (emplacement de confiance)
+PROFILE_SETTINGS = """<?xml version="1.0" encoding="UTF-8"?>
+<oor:items xmlns:oor="http://openoffice.org/2001/registry" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<item oor:path="/org.openoffice.Office.Common/Security/Scripting"><prop oor:name="MacroSecurityLevel" oor:op="fuse"><value>2</value></prop></item>
+<item oor:path="/org.openoffice.Office.Common/Security/Scripting"><prop oor:name="SecureURL" oor:op="fuse"><value><it>{trusted}</it></value></prop></item>
+</oor:items>
+"""
+
+
+# ---------------------------------------------------------------------------
+# Répertoire de travail et publication
+# ---------------------------------------------------------------------------
+def scratch_dir(name):
+    """Crée le répertoire de travail de l'exécution, sur tmpfs si possible."""
+    base = os.environ.get('ASCIIDOC_GENERATOR_SCRATCH')
+    if not base and os.access('/dev/shm', os.W_OK):
+        base = '/dev/shm'
+    return Path(tempfile.mkdtemp(prefix=f'{name}.', dir=base))
+
+
+def publish(path, outdir):
+    """Place `path` dans `outdir` par un renommage atomique."""
+    target = Path(outdir) / path.name
+    try:
+        os.replace(path, target)
+    except OSError:
+        # tmpfs et répertoire de sortie sur deux systèmes de fichiers : copie
+        # sous un nom temporaire voisin, puis renommage
+        tmp = target.with_name(f'.{target.name}.{os.getpid()}.tmp')
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    print(f"{path.name} -> {target}")
+    return target
+
+
+# ---------------------------------------------------------------------------
+# Étapes
+# ---------------------------------------------------------------------------
+def prepare_docbook(docbook, outdir):
+    """
+    Prépare le DocBook d'asciidoctor pour pandoc :
+    - contentwidth/contentdepth (bug asciidoctor du 20/12/2024) deviennent width/depth ;
+    - les images sont référencées par leur chemin dans `outdir` ;
+    - le premier <simpara> avant toute section (champs d'en-tête) est retiré ;
+    - les sauts de page deviennent un marqueur traité par parse.py.
+    """
+    docbook = docbook.replace('contentwidth', 'width').replace('contentdepth', 'depth')
+    docbook = re.sub(r'fileref="([^"]*)"', lambda m: f'fileref="{outdir}/{m.group(1)}"', docbook)
+    lines, found, skip = [], False, False
+    for line in docbook.splitlines(keepends=True):
+        if not found and '<section' in line:
+            found = True
+        if not found and '<simpara>' in line:
+            found, skip = True, True
+            continue
+        if skip and '</simpara>' in line:
+            skip = False
+            continue
+        if not skip:
+            lines.append(line)
+    return ''.join(lines).replace('<?asciidoc-pagebreak?>', 'saut_de_page784567')
+
+
+def office_profile(scratch, name='lo-profile'):
+    """Crée dans `scratch` un profil LibreOffice propre à l'exécution."""
+    profile = Path(scratch) / name
+    (profile / 'user').mkdir(parents=True, exist_ok=True)
+    (profile / 'user' / 'registrymodifications.xcu').write_text(
+        PROFILE_SETTINGS.format(trusted=Path(scratch).resolve().as_uri()), encoding='utf-8')
+    return profile
+
+
+def _office(profile, *args):
+    """Lance LibreOffice sans interface sur le profil `profile`."""
+    subprocess.run([office_binary(), f"-env:UserInstallation={Path(profile).resolve().as_uri()}",
+                    '--headless', '--invisible', *map(str, args)], check=True)
+
+
+def _expect(path):
+    """Vérifie que LibreOffice a bien produit `path`."""
+    if not Path(path).is_file():
+        raise FileNotFoundError(f"LibreOffice n'a pas produit {path}")
+    return Path(path)
+
+
+def office_convert(document, fmt, outdir, profile):
+    _office(profile, '--convert-to', fmt, '--outdir', outdir, document)
+    return _expect(Path(outdir) / f"{Path(document).stem}.{fmt}")
+
+
+@lru_cache(maxsize=None)
+def uno_python():
+    """
+    Interpréteur python disposant du module uno de LibreOffice : celui-ci,
+    celui livré avec LibreOffice (program/python, à côté de office_binary())
+    ou /usr/bin/python3. None si aucun ne l'a.
+    """
+    if importlib.util.find_spec('uno') is not None:
+        return sys.executable
+    candidates = [Path('/usr/bin/python3')]
+    binary = shutil.which(office_binary())
+    if binary:
+        candidates.insert(0, Path(os.path.realpath(binary)).parent / 'python')
+    for python in candidates:
+        if python.is_file() and os.access(python, os.X_OK) and subprocess.run(
+                [str(python), '-c', 'import uno'], capture_output=True).returncode == 0:
+            return str(python)
+    print("Module python uno introuvable : un loffice --convert-to par format exporté.")
+    return None
+
+
+def office_export(document, formats, outdir, profile):
+    """Exporte `document` dans `formats` : un seul chargement si uno est disponible."""
+    python = uno_python()
+    if python:
+        subprocess.run([python, str(SCRIPT_DIR / 'lo_export.py'), '--profile', str(profile),
+                        '--outdir', str(outdir), str(document), *formats], check=True)
+    else:
+        for fmt in formats:
+            office_convert(document, fmt, outdir, profile)
+    return [_expect(Path(outdir) / f"{Path(document).stem}.{fmt}") for fmt in formats]
+
+
+def run_macros(document, profile, macros):
+    for macro in macros:
+        _office(profile, f"vnd.sun.star.script:Standard.module1.{macro}?language=Basic&location=document",
+                document)
+    # les macros enregistrent le document en place
+    return _expect(document)
+
+
+def prepare_fragment(fragment, scratch, profile, context, test=False):
+    """
+    Convertit en fodt l'odt `fragment` rendu par pandoc, remplit les champs
+    du modèle et met en forme les tableaux. Renvoie le fodt.
+    """
+    fodt = office_convert(fragment, 'fodt', scratch, profile)
+    store = fodt_scan.BinaryStore()
+    content = parse.fill_template(fodt_scan.read(fodt, store), context)
+    fodt_scan.write(fodt, content, store)
+    if not test:
+        run_macros(fodt, profile, FRAGMENT_MACROS)
+    return fodt
+
+
+def generate(source, outdir, name, template_dir, formats, attributes, shards=0, test=False,
+             worker=None):
+    """
+    Produit les documents `formats` de `source` dans `outdir`, sous le nom
+    `name`. Renvoie la liste des fichiers publiés. `worker` est un
+    AsciidoctorWorker partagé entre plusieurs appels ; sans lui, un
+    processus asciidoctor est lancé pour ce seul document.
+    """
+    outdir = Path(outdir).resolve()
+    template_dir = Path(template_dir)
+    office_formats = [f for f in OFFICE_FORMATS if f in formats]
+    need_office = bool(office_formats) or 'fodt' in formats
+    pandoc_targets = (['odt'] if need_office else []) + [f for f in PANDOC_FORMATS if f in formats]
+
+    scratch = scratch_dir(name)
+    results = []
+    try:
+        docbook = None
+        if pandoc_targets:
+            if worker is None:
+                with AsciidoctorWorker() as own_worker:
+                    docbook = own_worker.docbook(source, outdir=outdir, attributes=attributes)
+            else:
+                docbook = worker.docbook(source, outdir=outdir, attributes=attributes)
+        if 'adoc' in formats:
+            # flat document for AI purposes, includes expanded without asciidoctor-reducer
+            results.append(asc_flatten.flatten_file(source, scratch / f"{name}.adoc", attributes))
+
+        if pandoc_targets:
+            # parse the docbook once into a cached pandoc AST, then render odt, rst... in parallel
+            if test:
+                odt_options = [f"--reference-doc={template_dir / 'frame.odt'}"]
+            else:
+                odt_options = [f"--template={template_dir / 'template.fodt'}",
+                               f"--reference-doc={template_dir / 'style.odt'}"]
+            prepared = prepare_docbook(docbook, outdir).encode('utf-8')
+            rendered = pandoc_ast.render_all(prepared, scratch / name, pandoc_targets,
+                                             {'odt': odt_options}, shards=shards)
+            results.extend(Path(path) for path in rendered if not str(path).endswith('.odt'))
+            fragments = [Path(path) for path in rendered if str(path).endswith('.odt')]
+
+        if need_office:
+            # treat fields in fodt file from docbook: title, author, signature table, revision table
+            context = asc_header.build_context(parse.docbook_info(io.BytesIO(docbook.encode('utf-8'))))
+            profile = office_profile(scratch)
+            if len(fragments) == 1:
+                fodt = prepare_fragment(fragments[0], scratch, profile, context, test)
+            else:
+                # one LibreOffice profile per fragment so that the conversions run side by side
+                with ThreadPoolExecutor(max_workers=len(fragments)) as pool:
+                    jobs = [pool.submit(prepare_fragment, fragment, scratch,
+                                        office_profile(scratch, f'lo-profile-{index}'), context, test)
+                            for index, fragment in enumerate(fragments, 1)]
+                    fodts = [job.result() for job in jobs]
+                fodt = fodt_merge.merge_files(fodts, scratch / f"{name}.fodt")
+            if not test:
+                run_macros(fodt, profile, DOCUMENT_MACROS)
+            if office_formats:
+                results.extend(office_export(fodt, office_formats, scratch, profile))
+            if 'fodt' in formats:
+                results.append(fodt)
+
+        return [publish(Path(path), outdir) for path in results]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Programme principal
+# ---------------------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(
+        description="Génère les documents d'un fichier Asciidoctor sans fichiers intermédiaires")
+    parser.add_argument("sources", nargs="+", help="Documents .asc")
+    parser.add_argument("--outdir", default=".", help="Répertoire de sortie")
+    parser.add_argument("--name", default=None,
+                        help="Nom des sorties, sans extension (une seule source)")
+    parser.add_argument("--template-dir", dest="template_dir",
+                        default=str(SCRIPT_DIR.parent / 'template'), help="Répertoire des modèles")
+    parser.add_argument("--formats", default=DEFAULT_FORMATS,
+                        help=f"Formats séparés par des virgules parmi {','.join(FORMATS)}")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Rendu parallèle du document en N morceaux (0 : désactivé)")
+    parser.add_argument("--test", action="store_true",
+                        help="Modèle frame.odt, sans macros LibreOffice")
+    parser.add_argument("--max-jobs", dest="max_jobs", type=int, default=50,
+                        help="Conversions avant recyclage du processus asciidoctor")
+    parser.add_argument("-a", "--attribute", action="append", default=[],
+                        metavar="NOM=VALEUR", help="Attribut de document")
+    args = parser.parse_args()
+
+    if args.name and len(args.sources) > 1:
+        sys.exit("Erreur : --name n'est utilisable qu'avec une seule source.")
+    formats = [f for f in args.formats.split(',') if f]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        sys.exit(f"Erreur : format inconnu '{unknown[0]}' (formats possibles : {','.join(FORMATS)}).")
+
+    attributes = asc_header.env_attributes()
+    for item in args.attribute:
+        key, _, value = item.partition('=')
+        attributes[key] = value
+
+    outdir = Path(args.outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    failed = 0
+    with AsciidoctorWorker(max_jobs=args.max_jobs) as worker:
+        for source in args.sources:
+            name = args.name or Path(source).name.split('.')[0]
+            try:
+                generate(source, outdir, name, args.template_dir, formats, attributes,
+                         args.shards, args.test, worker)
+            except WorkerError as e:
+                print(f"Erreur : {e}", file=sys.stderr)
+                failed += 1
+            except OSError as e:
+                print(f"Erreur : {source} : {e}", file=sys.stderr)
+                failed += 1
+            except subprocess.CalledProcessError as e:
+                print(f"Erreur : {source} : {' '.join(map(str, e.cmd[:4]))}... a échoué "
+                      f"(code {e.returncode}).", file=sys.stderr)
+                failed += 1
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
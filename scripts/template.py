@@ -3,6 +3,11 @@
 import sys
 import re
 
+try:
+    from . import fodt_scan
+except ImportError:
+    import fodt_scan
+
 def extraire_styles(lines):
     """
     Parcourt le document pour localiser les sections
@@ -157,9 +162,9 @@ def main():
     input_file = sys.argv[1]
     output_file = sys.argv[2]
 
-    # Lecture du contenu
-    with open(input_file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+    # Lecture du contenu, images embarquées mises de côté
+    store = fodt_scan.BinaryStore()
+    lines = fodt_scan.read(input_file, store).splitlines(keepends=True)
 
     # 1) On construit la map de styles
     style_map = extraire_styles(lines)
@@ -168,10 +173,8 @@ def main():
     output_lines = []
     transforme_et_ecris(lines, style_map, output_lines)
 
-    # Écriture du résultat
-    with open(output_file, "w", encoding="utf-8") as f:
-        for l in output_lines:
-            f.write(l if l.endswith("\n") else l + "\n")
+    # Écriture du résultat, images réinsérées
+    fodt_scan.write(output_file, "".join(l if l.endswith("\n") else l + "\n" for l in output_lines), store)
 
 
 if __name__ == "__main__":
@@ -9,6 +9,15 @@ LiteLLM API for translation to English, and writes the translated text to
 <output_file>. If <output_file> already exists, its previous contents are
 saved to <output_file>.old before being overwritten.
 
+By default the whole document is sent in a single request. With
+--batch-tokens=N, the document is split into segments (paragraphs, list
+items, tables...): listing, literal and comment blocks are kept as is and
+the other segments are packed into requests of at most N tokens, which
+keeps each answer short. Segments are wrapped in numbered markers checked
+on the way back; a batch whose answer merges or drops segments is split
+and retried. The extra prompt tokens this costs over the single request,
+and the verbatim tokens it does not send, are reported.
+
 Configuration:
     The API key and model configuration is loaded automatically from a **.env** file at the
     project root **or** from environment variables. Optionally, you may still override it
@@ -27,16 +36,45 @@ from __future__ import annotations
 
 import argparse
 import os
+import re
 import shutil
 import sys
 from pathlib import Path
 
-from dotenv import load_dotenv
-import litellm  # Requires litellm>=1.0.0
+# litellm and python-dotenv are imported lazily: litellm alone takes seconds to
+# import, which --help and skipped files should not pay.
 
 DEFAULT_MODEL = "openrouter/openai/gpt-4o-mini"  # Default model, can be overridden via CLI or env
 TEMPERATURE = 0.2
 
+SYSTEM_PROMPT = (
+    "You are a professional translator. Translate the following French "
+    "technical document about cybersecurity from French into clear, "
+    "concise English. Preserve ALL AsciiDoctor markup, code blocks, "
+    "and diagrams exactly as they appear—only translate natural language "
+    "sentences."
+)
+
+# Appended to the system prompt when several segments share one request
+PACKED_INSTRUCTIONS = (
+    " The input is split into numbered segments: each one starts with a line "
+    "<<<SEG n>>> and ends with a line <<<END n>>>. Translate every segment on its "
+    "own and return all of them in the same order, each between exactly the same "
+    "two marker lines. Never merge, split, drop or add segments and write nothing "
+    "outside the markers."
+)
+
+DEFAULT_BATCH_TOKENS = 0  # Token budget of the segments packed in one request, 0: whole document
+
+PACKED_SEGMENT_RE = re.compile(r"<<<SEG (\d+)>>>\n(.*?)\n?<<<END \1>>>", re.DOTALL)
+
+# Lines opening/closing a delimited block: blank lines inside do not end a segment
+DELIMITER_RE = re.compile(r"^(-{4,}|\.{4,}|={4,}|\*{4,}|_{4,}|\+{4,}|/{4,}|`{3,}|\|===)\s*$")
+# Listing, literal, passthrough and comment blocks are never translated
+VERBATIM_DELIMITERS = ("-", ".", "+", "/", "`")
+# Lines with nothing to translate: attribute entries, block attributes, comments, block macros
+NON_TEXT_LINE_RE = re.compile(r"^(:[\w-]+!?:.*|\[.*\]|//.*|[\w-]+::\S*\[.*\])\s*$")
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -50,29 +88,154 @@ def backup_old_file(path: Path) -> None:
         print(f"Backed up existing {path} to {backup_path}")
 
 
-def translate(api_key: str, model: str, text: str) -> str:
-    """Translate *text* from French to English using the LiteLLM API."""
+def estimate_tokens(text: str) -> int:
+    """Rough token count of *text* (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def complete(api_key: str, model: str, system: str, text: str) -> str:
+    """Send *text* to the LiteLLM API under the *system* prompt."""
+    import litellm  # Requires litellm>=1.0.0
+
     response = litellm.completion(
         api_key=api_key,
         model=model,
         temperature=TEMPERATURE,
         messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a professional translator. Translate the following French "
-                    "technical document about cybersecurity from French into clear, "
-                    "concise English. Preserve ALL AsciiDoctor markup, code blocks, "
-                    "and diagrams exactly as they appear—only translate natural language "
-                    "sentences."
-                ),
-            },
+            {"role": "system", "content": system},
             {"role": "user", "content": text},
         ],
     )
     return response.choices[0].message.content.strip()  # type: ignore[attr-defined]
 
 
+def translate(api_key: str, model: str, text: str) -> str:
+    """Translate *text* from French to English using the LiteLLM API."""
+    return complete(api_key, model, SYSTEM_PROMPT, text)
+
+
+# ---------------------------------------------------------------------------
+# Segment packing
+# ---------------------------------------------------------------------------
+
+def split_segments(text: str) -> list[tuple[bool, str]]:
+    """Split *text* into ``(translatable, chunk)`` pairs whose concatenation is *text*.
+
+    Segments are runs of non-blank lines (a delimited block is kept whole);
+    blank lines, listing/literal/comment blocks and lines without prose
+    (attribute entries, block attributes, block macros) are not translatable.
+    """
+    segments: list[tuple[bool, str]] = []
+    current: list[str] = []
+    verbatim = True  # current segment has no prose so far
+    delimiter = None  # delimiter of the block the current line is in
+
+    def flush() -> None:
+        nonlocal current, verbatim
+        if current:
+            segments.append((not verbatim, "".join(current)))
+        current, verbatim = [], True
+
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if delimiter is None and not stripped:
+            flush()
+            segments.append((False, line))
+            continue
+        current.append(line)
+        match = DELIMITER_RE.match(stripped)
+        if delimiter is not None:
+            if stripped == delimiter:
+                delimiter = None
+            elif not delimiter.startswith(VERBATIM_DELIMITERS):
+                verbatim = False
+        elif match:
+            delimiter = match.group(1)
+        elif not NON_TEXT_LINE_RE.match(stripped):
+            verbatim = False
+    flush()
+    return segments
+
+
+def pack(segments: list[tuple[int, str]], budget: int) -> list[list[tuple[int, str]]]:
+    """Group consecutive ``(index, text)`` segments into batches of at most *budget* tokens."""
+    batches: list[list[tuple[int, str]]] = []
+    size = 0
+    for segment in segments:
+        tokens = estimate_tokens(segment[1])
+        if batches and size + tokens <= budget:
+            batches[-1].append(segment)
+            size += tokens
+        else:
+            batches.append([segment])
+            size = tokens
+    return batches
+
+
+def parse_packed(response: str, numbers: list[int]) -> list[str] | None:
+    """Return the segments of *response*, or None unless exactly *numbers* came back in order."""
+    matches = list(PACKED_SEGMENT_RE.finditer(response))
+    if [int(m.group(1)) for m in matches] != numbers:
+        return None
+    if PACKED_SEGMENT_RE.sub("", response).strip():
+        return None
+    return [m.group(2) for m in matches]
+
+
+def translate_batch(api_key: str, model: str, batch: list[tuple[int, str]], stats: dict) -> dict[int, str]:
+    """Translate the ``(index, text)`` segments of *batch* and return ``{index: translation}``.
+
+    A batch whose answer does not carry back every segment exactly once
+    (merged, dropped or renumbered segments) is split in two and retried.
+    """
+    stats["requests"] += 1
+    if len(batch) == 1:
+        index, text = batch[0]
+        stats["overhead"] += estimate_tokens(SYSTEM_PROMPT)
+        return {index: translate(api_key, model, text.rstrip())}
+
+    numbers = list(range(1, len(batch) + 1))
+    markers = "".join(f"<<<SEG {n}>>>\n<<<END {n}>>>\n" for n in numbers)
+    packed = "".join(f"<<<SEG {n}>>>\n{text.rstrip()}\n<<<END {n}>>>\n"
+                     for n, (_, text) in zip(numbers, batch))
+    # system prompt and instructions once, markers sent and echoed back
+    stats["overhead"] += estimate_tokens(SYSTEM_PROMPT + PACKED_INSTRUCTIONS) + 2 * estimate_tokens(markers)
+    translations = parse_packed(complete(api_key, model, SYSTEM_PROMPT + PACKED_INSTRUCTIONS, packed), numbers)
+    if translations is None:
+        stats["splits"] += 1
+        middle = len(batch) // 2
+        return {**translate_batch(api_key, model, batch[:middle], stats),
+                **translate_batch(api_key, model, batch[middle:], stats)}
+    return {index: translation.strip("\n") for (index, _), translation in zip(batch, translations)}
+
+
+def translate_document(api_key: str, model: str, text: str, budget: int) -> tuple[str, dict]:
+    """Translate *text* segment by segment, packing segments up to *budget* tokens per request.
+
+    Returns the translated text and the packing statistics.
+    """
+    segments = split_segments(text)
+    todo = [(index, chunk) for index, (translatable, chunk) in enumerate(segments) if translatable]
+    verbatim = [chunk for translatable, chunk in segments if not translatable and chunk.strip()]
+    stats = {"segments": len(todo), "requests": 0, "splits": 0, "overhead": 0,
+             "verbatim": len(verbatim), "verbatim_tokens": sum(estimate_tokens(chunk) for chunk in verbatim)}
+
+    translations: dict[int, str] = {}
+    for batch in pack(todo, budget):
+        translations.update(translate_batch(api_key, model, batch, stats))
+
+    output = []
+    for index, (translatable, chunk) in enumerate(segments):
+        if translatable:
+            # keep the original line endings of the segment
+            output.append(translations[index] + chunk[len(chunk.rstrip()):])
+        else:
+            output.append(chunk)
+    # baseline: the whole document in one request, hence one system prompt
+    stats["extra"] = stats["overhead"] - estimate_tokens(SYSTEM_PROMPT)
+    return "".join(output), stats
+
+
 def parse_args() -> argparse.Namespace:
     """Parse command‑line arguments."""
     parser = argparse.ArgumentParser(
@@ -83,6 +246,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--api-key", dest="api_key", help="Override the API key (else .env / env var)")
     parser.add_argument("--model", dest="model", default=DEFAULT_MODEL, help=f"Model to use for translation (default: {DEFAULT_MODEL})")
     parser.add_argument("--env-file", dest="env_file", default=None, help="Custom path to a .env file")
+    parser.add_argument("--batch-tokens", dest="batch_tokens", type=int, default=DEFAULT_BATCH_TOKENS,
+                        help="Pack the document segments into requests of at most this many tokens "
+                             "(default: 0, the whole document in a single request)")
     return parser.parse_args()
 
 
@@ -96,6 +262,8 @@ def main() -> None:
     # ---------------------------------------------------------------------
     # Load .env configuration (before reading env vars)
     # ---------------------------------------------------------------------
+    from dotenv import load_dotenv
+
     load_dotenv(dotenv_path=args.env_file, override=False)
 
     # Retrieve API key (CLI arg wins over ENV)
@@ -125,10 +293,20 @@ def main() -> None:
     # Call LiteLLM to translate
     print(f"Translating {input_path.name} using model {model}... (this may take a moment)")
     try:
-        english_text = translate(api_key, model, french_text)
+        if args.batch_tokens > 0:
+            english_text, stats = translate_document(api_key, model, french_text, args.batch_tokens)
+        else:
+            english_text, stats = translate(api_key, model, french_text), None
     except Exception as e:
         sys.exit(f"Error while calling the LiteLLM API: {e}")
 
+    if stats:
+        per_request = stats["segments"] / stats["requests"] if stats["requests"] else 0
+        print(f"{stats['segments']} segments in {stats['requests']} requests "
+              f"({per_request:.1f} segments per request, {stats['splits']} batches split), "
+              f"~{stats['extra']} prompt tokens more than a whole-document request, "
+              f"{stats['verbatim']} verbatim segments (~{stats['verbatim_tokens']} tokens) not sent")
+
     # Write translated output
     with output_path.open("w", encoding="utf-8") as f:
         f.write(english_text)
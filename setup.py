@@ -38,9 +38,25 @@ setup(
         "scripts/generate.sh",
         "scripts/clean_template.sh",
         "scripts/parse.py",
+        "scripts/pipeline.py",
+        "scripts/asc_header.py",
+        "scripts/asc_flatten.py",
+        "scripts/lo_export.py",
+        "scripts/pandoc_ast.py",
+        "scripts/docbook_shards.py",
+        "scripts/fodt_merge.py",
+        "scripts/asciidoctor_worker.py",
+        "scripts/asciidoctor_worker.rb",
         "scripts/style.py",
+        "scripts/dedup_styles.py",
+        "scripts/fodt_scan.py",
         "scripts/template.py",
     ],
+    entry_points={
+        "console_scripts": [
+            "asciidoc-generate=scripts.generate:main",
+        ],
+    },
     include_package_data=True,
     package_data={
         "": ["template/*", "scripts/*", "*.asc", "*.lua"],
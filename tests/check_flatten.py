@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+check_flatten.py – Contrôle asc_flatten.py sur le document de tests/flatten.
+
+Le document couvre les inclusions (chemin avec attribut, imbriquées,
+facultatives, introuvables), tags=/tag=, lines=, leveloffset relatif
+imbriqué, ifdef/ifndef/ifeval et les directives échappées. Le résultat doit
+être identique à tests/flatten/expected.adoc ; si asciidoctor-reducer est
+installé, il doit aussi être identique à sa sortie.
+
+Usage :
+    python tests/check_flatten.py [--reducer PROGRAMME]
+"""
+
+from pathlib import Path
+import argparse
+import difflib
+import shutil
+import subprocess
+import sys
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+FIXTURE_DIR = Path(__file__).resolve().parent / 'flatten'
+
+sys.path.insert(0, str(REPO_DIR))
+from scripts import asc_flatten
+
+
+def compare(expected, actual, expected_name, actual_name):
+    """Affiche les différences entre deux textes ; renvoie True s'ils sont identiques."""
+    diff = list(difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                     expected_name, actual_name))
+    sys.stdout.writelines(diff)
+    return not diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle asc_flatten.py sur un document de référence")
+    parser.add_argument("--reducer", default=shutil.which('asciidoctor-reducer'),
+                        help="Programme asciidoctor-reducer à comparer (défaut : celui du PATH)")
+    args = parser.parse_args()
+
+    source = FIXTURE_DIR / 'main.asc'
+    flat = ''.join(line + '\n' for line in asc_flatten.Flattener().flatten(source))
+
+    ok = compare((FIXTURE_DIR / 'expected.adoc').read_text(encoding='utf-8'), flat,
+                 'expected.adoc', 'asc_flatten')
+    print(f"{'ok   ' if ok else 'ÉCHEC'} asc_flatten / expected.adoc")
+
+    if args.reducer:
+        result = subprocess.run([args.reducer, '-o', '-', str(source)],
+                                capture_output=True, text=True, check=True)
+        same = compare(result.stdout, flat, 'asciidoctor-reducer', 'asc_flatten')
+        print(f"{'ok   ' if same else 'ÉCHEC'} asc_flatten / asciidoctor-reducer")
+        ok = ok and same
+    else:
+        print("--    asc_flatten / asciidoctor-reducer : programme absent, comparaison ignorée")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
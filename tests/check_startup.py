@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+check_startup.py – Contrôle le budget de démarrage de `asciidoc-generate`.
+
+Lance le point d'entrée sous `python -X importtime` pour quelques commandes
+qui ne doivent rien charger de lourd (--help, sous-commandes --help) et
+échoue si :
+    - la commande échoue, par exemple sur un module absent à l'import ;
+    - un module lourd (litellm, dotenv, jinja2...) est importé ;
+    - le temps d'import des modules propres au programme, c'est-à-dire hors
+      ceux que l'interpréteur charge seul, dépasse le budget.
+
+Les sous-commandes generate et clean-template remplacent le processus par
+un script shell (exec) : seul l'aiguillage python qui précède est mesuré.
+
+Usage :
+    python tests/check_startup.py [--budget-ms N]
+"""
+
+from pathlib import Path
+import argparse
+import subprocess
+import sys
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+# Modules qui ne doivent être importés que par la sous-commande qui s'en sert
+HEAVY_MODULES = ('litellm', 'dotenv', 'jinja2', 'openai', 'httpx', 'uno')
+
+# Lignes de commande contrôlées
+COMMANDS = (
+    ['--help'],
+    ['generate', '--help'],
+    ['clean-template', '--help'],
+    ['translate', '--help'],
+    ['tree', '--help'],
+)
+
+DEFAULT_BUDGET_MS = 40
+
+
+def imported_modules(args):
+    """
+    Lance `python -X importtime args`. Renvoie le code de retour,
+    {module: temps d'import propre en µs} et les autres lignes d'erreur.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args],
+                            cwd=REPO_DIR, capture_output=True, text=True)
+    modules, errors = {}, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        if 'imported package' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(self_us)
+    return result.returncode, modules, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Contrôle le budget de démarrage de asciidoc-generate")
+    parser.add_argument("--budget-ms", dest="budget_ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Budget d'import en millisecondes (défaut : {DEFAULT_BUDGET_MS})")
+    args = parser.parse_args()
+
+    _, baseline, _ = imported_modules(['-c', 'pass'])
+    failed = False
+    for command in COMMANDS:
+        returncode, modules, errors = imported_modules(['-m', 'scripts.generate', *command])
+        heavy = sorted(m for m in modules if m.split('.')[0] in HEAVY_MODULES)
+        own_ms = sum(us for m, us in modules.items() if m not in baseline) / 1000
+        label = ' '.join(['asciidoc-generate', *command])
+        if returncode:
+            print(f"ÉCHEC {label} : code de retour {returncode}")
+            for line in errors[-5:]:
+                print(f"      {line}")
+            failed = True
+        elif heavy:
+            print(f"ÉCHEC {label} : modules lourds importés : {', '.join(heavy)}")
+            failed = True
+        elif own_ms > args.budget_ms:
+            print(f"ÉCHEC {label} : {own_ms:.1f} ms d'import (budget {args.budget_ms:g} ms)")
+            failed = True
+        else:
+            print(f"ok    {label} : {own_ms:.1f} ms d'import")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
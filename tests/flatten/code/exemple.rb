@@ -0,0 +1,11 @@
+# Exemple
+require 'json'
+# tag::calcul[]
+def somme(a, b)
+  a + b
+end
+# end::calcul[]
+# tag::interne[]
+def secret; end
+# end::interne[]
+puts somme(1, 2)